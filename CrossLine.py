@@ -1,6 +1,8 @@
 from utils import (create_board, add_pairs_to_board, visualize_board, 
-                   get_path_cost, solve_crossline)
+                   get_path_cost, solve_crossline, new_solve_profile)
+from search_trace import SearchTraceRecorder
 import argparse
+import cProfile
 import time
 
 def parse_pair(pair_str):
@@ -17,13 +19,32 @@ def parse_pair(pair_str):
         print(f"解析错误: {e}")
         return None
 
+def print_profile(profile, total_time):
+    print("阶段耗时:")
+    accounted = 0.0
+    for phase, elapsed in sorted(profile["phases"].items(), key=lambda item: -item[1]):
+        accounted += elapsed
+        print(f"  {phase:<10} {elapsed * 1000:9.2f}ms  {elapsed / total_time if total_time else 0:6.1%}")
+    other = max(0.0, total_time - accounted)
+    print(f"  {'other':<10} {other * 1000:9.2f}ms  {other / total_time if total_time else 0:6.1%}")
+    for color, phases in profile["colors"].items():
+        print(f"  颜色 {color}: " + ", ".join(f"{phase}={elapsed * 1000:.2f}ms" for phase, elapsed in phases.items()))
+
 def main():
     parser = argparse.ArgumentParser(description="交叉线游戏求解器")
     parser.add_argument("--size", type=int, default=8, help="棋盘大小")
     parser.add_argument("--pairs", type=str, nargs="+", help="棋子对，格式: '色号:x1,y1-x2,y2'")
     parser.add_argument("--turning_cost", action="store_true", help="是否考虑转向代价")
     parser.add_argument("--quiet", action="store_true", help="安静模式，不显示详细进度")
+    parser.add_argument("--trace", type=str, help="将搜索过程记录到二进制轨迹文件，可用search_trace.py回放分析")
+    parser.add_argument("--epsilon", type=float, default=None, help="有界次优搜索参数: 0为每种颜色的最优路径, >0时保证代价不超过最优的(1+epsilon)倍")
+    parser.add_argument("--engine", choices=["astar", "lee", "turn"], default="astar", help="搜索引擎: astar为逐色双向A*, lee为所有颜色同时推进的NumPy波前布线(仅不含转向代价时), turn为按朝向合并状态的最小转向代价双向A*")
+    parser.add_argument("--profile", action="store_true", help="输出每种代价模式下按阶段(排序/搜索/验证/提交/输出)和颜色划分的耗时")
+    parser.add_argument("--profile-dump", type=str, default=None, help="将cProfile统计写入文件(pstats格式，可用snakeviz、flameprof等工具查看)")
+    parser.add_argument("--order", choices=["static", "dynamic"], default="static", help="颜色排序模式: static为预先排序, dynamic为每次提交后按当前占用下的距离场选择最受限的颜色, 并跳过会阻断其他颜色的路径")
     args = parser.parse_args()
+    if args.epsilon is not None and args.engine != "astar":
+        parser.error(f"--epsilon 仅适用于 astar 引擎，不能与 --engine {args.engine} 同时使用")
     verbose = not args.quiet
     board = create_board(args.size)
     pairs = {}
@@ -45,11 +66,17 @@ def main():
             3: [(2, 2), (3, 0)]
         }
     board = add_pairs_to_board(board, pairs)
+    trace = SearchTraceRecorder(args.trace) if args.trace else None
+    profiler = cProfile.Profile() if args.profile_dump else None
+    profile = new_solve_profile() if args.profile else None
+    profile_with_turn = new_solve_profile() if args.profile else None
     print("初始棋盘:")
     visualize_board(board)
     print("不考虑转向代价的解:")
     start_time = time.time()
-    paths = solve_crossline(board, pairs, False, verbose)
+    if profiler is not None:
+        profiler.enable()
+    paths = solve_crossline(board, pairs, False, verbose, args.order, trace, epsilon=args.epsilon, engine=args.engine, profile=profile)
     time_taken = time.time() - start_time
     if not paths:
         print("无法完成所有棋子的连接，求解失败")
@@ -59,9 +86,17 @@ def main():
             cost = get_path_cost(path, False)
             print(f"颜色 {color} 的路径长度: {cost}")
         print(f"求解耗时: {time_taken:.2f}秒")
+    if profiler is not None:
+        profiler.disable()
+    if profile is not None:
+        total_time = time.time() - start_time
+        profile["phases"]["visualize"] = total_time - time_taken
+        print_profile(profile, total_time)
     print("\n考虑转向代价的解:")
     start_time = time.time()
-    paths_with_turn = solve_crossline(board, pairs, True, verbose)
+    if profiler is not None:
+        profiler.enable()
+    paths_with_turn = solve_crossline(board, pairs, True, verbose, args.order, trace, epsilon=args.epsilon, engine=args.engine, profile=profile_with_turn)
     time_taken = time.time() - start_time
     if not paths_with_turn:
         print("无法完成所有棋子的连接，求解失败")
@@ -73,6 +108,17 @@ def main():
             turn_cost = total_cost - basic_cost
             print(f"颜色 {color} 的路径: 基本长度={basic_cost}, 转向代价={turn_cost}, 总代价={total_cost}")
         print(f"求解耗时: {time_taken:.2f}秒")
+    if profiler is not None:
+        profiler.disable()
+        profiler.dump_stats(args.profile_dump)
+        print(f"cProfile统计已写入 {args.profile_dump}")
+    if profile_with_turn is not None:
+        total_time = time.time() - start_time
+        profile_with_turn["phases"]["visualize"] = total_time - time_taken
+        print_profile(profile_with_turn, total_time)
+    if trace is not None:
+        trace.close()
+        print(f"搜索轨迹已写入 {args.trace}")
 
 def interactive_mode():
     try:
@@ -0,0 +1,177 @@
+import argparse
+import heapq
+import json
+import sys
+import time
+import numpy as np
+from typing import Dict, List, Set, Tuple
+from utils import create_board, add_pairs_to_board, solve_crossline, get_path_cost, generate_solvable_puzzles
+
+BASELINE_FILE = "perf_baseline.json"
+DEFAULT_SIZES = [8, 12, 16, 24]
+DEFAULT_COUNT = 20
+DEFAULT_SEED = 2024
+THRESHOLDS = {
+    "expansions": 0.05,
+    "solve_rate": 0.0,
+    "cost": 0.02,
+    "normalized_time": 1.0,
+}
+ADVISORY_METRICS = {"normalized_time"}
+CALIBRATION_SIZE = 64
+CALIBRATION_QUERIES = 32
+
+def _calibration_search(board: np.ndarray, start: Tuple[int, int], end: Tuple[int, int]) -> int:
+    size = board.shape[0]
+    g_score = {start: 0}
+    open_set = [(abs(start[0] - end[0]) + abs(start[1] - end[1]), 0, start)]
+    expanded = 0
+    while open_set:
+        _, g, current = heapq.heappop(open_set)
+        if current == end:
+            break
+        if g > g_score[current]:
+            continue
+        expanded += 1
+        for dx, dy in ((0, 1), (1, 0), (0, -1), (-1, 0)):
+            x, y = current[0] + dx, current[1] + dy
+            if 0 <= x < size and 0 <= y < size and board[x, y] == 0:
+                tentative_g = g + 1
+                if tentative_g < g_score.get((x, y), float('inf')):
+                    g_score[(x, y)] = tentative_g
+                    heapq.heappush(open_set, (tentative_g + abs(x - end[0]) + abs(y - end[1]), tentative_g, (x, y)))
+    return expanded
+
+def calibrate(repeats: int = 5) -> float:
+    rng = np.random.RandomState(DEFAULT_SEED)
+    board = (rng.random_sample((CALIBRATION_SIZE, CALIBRATION_SIZE)) < 0.25).astype(np.int32)
+    queries = []
+    for _ in range(CALIBRATION_QUERIES):
+        start, end = [tuple(int(v) for v in rng.randint(0, CALIBRATION_SIZE, 2)) for _ in range(2)]
+        board[start] = board[end] = 0
+        queries.append((start, end))
+    best = float('inf')
+    for _ in range(repeats):
+        start_time = time.perf_counter()
+        for start, end in queries:
+            _calibration_search(board, start, end)
+        best = min(best, time.perf_counter() - start_time)
+    return best
+
+def measure(size: int, count: int, seed: int, with_turning_cost: bool, order_mode: str = "static", engine: str = "astar", repeats: int = 3) -> Dict:
+    expansions = 0
+    costs = []
+    elapsed = 0.0
+    for puzzle in generate_solvable_puzzles(count, size, seed):
+        pairs = puzzle["pairs"]
+        board = add_pairs_to_board(create_board(size), pairs)
+        best = float('inf')
+        for _ in range(repeats):
+            stats = {}
+            np.random.seed(puzzle["seed"])
+            start_time = time.perf_counter()
+            paths = solve_crossline(board, pairs, with_turning_cost, False, order_mode, stats=stats, engine=engine)
+            best = min(best, time.perf_counter() - start_time)
+        elapsed += best
+        if stats:
+            expansions += int(stats["forward_expansions"].sum() + stats["backward_expansions"].sum())
+        costs.append(sum(get_path_cost(path, with_turning_cost) for path in paths.values()) if paths else None)
+    solved = [cost for cost in costs if cost is not None]
+    mean_cost = sum(solved) / len(solved) if solved else 0.0
+    return {"expansions": expansions, "solve_rate": len(solved) / count, "cost": mean_cost, "costs": costs, "time": elapsed}
+
+def run_corpus(sizes: List[int], count: int, seed: int, order_mode: str = "static", engine: str = "astar", verbose: bool = True) -> Dict:
+    unit = calibrate()
+    results = {}
+    for size in sizes:
+        for with_turning_cost in (False, True):
+            key = f"{size}x{size}{'/turns' if with_turning_cost else ''}"
+            result = measure(size, count, seed + size, with_turning_cost, order_mode, engine)
+            result["normalized_time"] = result["time"] / unit
+            results[key] = result
+            if verbose:
+                print(f"{key}: 扩展={result['expansions']}, 解出率={result['solve_rate']:.0%}, 平均代价={result['cost']:.1f}, 用时={result['time']:.2f}秒")
+    return {"sizes": sizes, "count": count, "seed": seed, "order_mode": order_mode, "engine": engine, "calibration": unit, "results": results}
+
+def compare(baseline: Dict, current: Dict, thresholds: Dict[str, float], advisory: Set[str] = ADVISORY_METRICS) -> Tuple[List[str], List[str], List[str]]:
+    lines = []
+    regressions = []
+    warnings = []
+    for key, base in baseline["results"].items():
+        now = current["results"].get(key)
+        if now is None:
+            regressions.append(f"{key}: 当前运行缺少此项")
+            continue
+        for metric, limit in thresholds.items():
+            old, new = base[metric], now[metric]
+            if metric == "cost" and len(base.get("costs", [])) == len(now["costs"]):
+                common = [(a, b) for a, b in zip(base["costs"], now["costs"]) if a is not None and b is not None]
+                old, new = sum(a for a, _ in common), sum(b for _, b in common)
+            if metric == "solve_rate":
+                change = old - new
+                worse = change > limit
+                text = f"{old:.0%} → {new:.0%}"
+            else:
+                change = (new - old) / old if old else (1.0 if new > old else 0.0)
+                worse = change > limit
+                text = f"{old:.4g} → {new:.4g} ({change:+.1%}, 阈值 +{limit:.0%})"
+            line = f"{key:<12} {metric:<16} {text}"
+            if not worse:
+                lines.append("     " + line)
+            elif metric in advisory:
+                lines.append("注意 " + line)
+                warnings.append(line)
+            else:
+                lines.append("回归 " + line)
+                regressions.append(line)
+    return lines, regressions, warnings
+
+def main():
+    parser = argparse.ArgumentParser(description="求解器性能回归检查: 用固定种子的谜题语料与基线比较")
+    parser.add_argument("--baseline", type=str, default=BASELINE_FILE, help="基线文件")
+    parser.add_argument("--update", action="store_true", help="用本次结果重写基线文件")
+    parser.add_argument("--sizes", type=int, nargs="+", default=None, help="棋盘大小列表 (默认沿用基线)")
+    parser.add_argument("--count", type=int, default=None, help="每种棋盘大小的谜题数量 (默认沿用基线)")
+    parser.add_argument("--seed", type=int, default=None, help="语料的随机种子 (默认沿用基线)")
+    parser.add_argument("--order", choices=["static", "dynamic"], default=None, help="颜色排序模式 (默认沿用基线)")
+    parser.add_argument("--engine", choices=["astar", "lee", "turn"], default=None, help="搜索引擎 (默认沿用基线)")
+    parser.add_argument("--strict-time", action="store_true", help="把用时超出阈值也算作回归 (默认仅提示，计时在共享机器上噪声较大)")
+    for metric, limit in THRESHOLDS.items():
+        parser.add_argument(f"--max-{metric.replace('_', '-')}", type=float, default=limit, dest=metric, help=f"{metric} 允许的最大恶化比例 (默认 {limit})")
+    args = parser.parse_args()
+    try:
+        with open(args.baseline, encoding="utf-8") as f:
+            baseline = json.load(f)
+    except FileNotFoundError:
+        baseline = None
+        if not args.update:
+            print(f"找不到基线文件 {args.baseline}，请先使用 --update 生成")
+            sys.exit(2)
+    config = baseline or {}
+    sizes = args.sizes or config.get("sizes", DEFAULT_SIZES)
+    count = args.count or config.get("count", DEFAULT_COUNT)
+    seed = args.seed if args.seed is not None else config.get("seed", DEFAULT_SEED)
+    order_mode = args.order or config.get("order_mode", "static")
+    engine = args.engine or config.get("engine", "astar")
+    current = run_corpus(sizes, count, seed, order_mode, engine)
+    if args.update:
+        with open(args.baseline, "w", encoding="utf-8") as f:
+            json.dump(current, f, ensure_ascii=False, indent=2)
+        print(f"基线已写入 {args.baseline}")
+        return
+    if (sizes, count, seed, order_mode, engine) != (baseline["sizes"], baseline["count"], baseline["seed"], baseline["order_mode"], baseline.get("engine", "astar")):
+        print("警告: 语料配置与基线不同，比较结果仅供参考")
+    advisory = set() if args.strict_time else ADVISORY_METRICS
+    lines, regressions, warnings = compare(baseline, current, {metric: getattr(args, metric) for metric in THRESHOLDS}, advisory)
+    print("\n".join(lines))
+    if warnings:
+        print(f"\n{len(warnings)} 项用时超出阈值 (仅提示，不计为回归；使用 --strict-time 可将其视为回归)")
+    if regressions:
+        print(f"\n发现 {len(regressions)} 项性能回归:")
+        for line in regressions:
+            print(f"  {line}")
+        sys.exit(1)
+    print("\n未发现性能回归")
+
+if __name__ == "__main__":
+    main()
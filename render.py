@@ -0,0 +1,208 @@
+import argparse
+import os
+import struct
+import time
+import zlib
+import numpy as np
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, List, Optional, Tuple
+from utils import (generate_colors, piece_radius, path_line_width, chain_to_array,
+                   CELL_SIZE, MARGIN, MAX_COLORS, GRID_COLOR, BORDER_COLOR, PIECE_OUTLINE, UNKNOWN_COLOR)
+from result_store import open_records, open_paths, open_pairs, unpack_paths, unpack_pairs, STATUS_NAMES
+
+MAX_IMAGE_SIZE = 1000
+MIN_GRID_CELL = 4
+MIN_LABEL_SCALE = 1
+DIGITS = {
+    "0": "111101101101111", "1": "010110010010111", "2": "111001111100111", "3": "111001111001111",
+    "4": "101101111001001", "5": "111100111001111", "6": "111100111101111", "7": "111001001001001",
+    "8": "111101111101111", "9": "111101111001111",
+}
+DIGIT_MASKS = {digit: np.array([bit == "1" for bit in bits]).reshape(5, 3) for digit, bits in DIGITS.items()}
+
+def default_cell_size(size: int) -> int:
+    if size * CELL_SIZE + 2 * MARGIN <= MAX_IMAGE_SIZE:
+        return CELL_SIZE
+    return max(2, (MAX_IMAGE_SIZE - 2 * MARGIN) // size)
+
+def hex_to_rgb(color: str) -> Tuple[int, int, int]:
+    return int(color[1:3], 16), int(color[3:5], 16), int(color[5:7], 16)
+
+def board_colors(pairs: Dict[int, List[Tuple[int, int]]]) -> Dict[int, str]:
+    return generate_colors(max([MAX_COLORS, *pairs]))
+
+def _as_coords(path) -> np.ndarray:
+    if isinstance(path, (bytes, bytearray, memoryview)):
+        return chain_to_array(path)
+    return np.asarray(path, dtype=np.int64).reshape(-1, 2)
+
+def _corners(coords: np.ndarray) -> np.ndarray:
+    if len(coords) <= 2:
+        return coords
+    delta = np.diff(coords, axis=0)
+    turns = np.flatnonzero(np.any(delta[1:] != delta[:-1], axis=1)) + 1
+    return coords[np.concatenate(([0], turns, [len(coords) - 1]))]
+
+def _disk(radius: float) -> Tuple[np.ndarray, np.ndarray, int]:
+    extent = int(np.ceil(radius))
+    offsets = np.arange(-extent, extent + 1) + 0.5
+    distance = np.hypot(offsets[:, None], offsets[None, :])
+    return distance <= radius, distance > radius - 2, extent
+
+def rasterize_board(size: int, pairs: Dict[int, List[Tuple[int, int]]], paths: Optional[Dict] = None, cell_size: Optional[int] = None, colors: Optional[Dict[int, str]] = None) -> np.ndarray:
+    cell_size = cell_size or default_cell_size(size)
+    colors = colors or board_colors(pairs)
+    span = size * cell_size
+    image = np.full((span + 2 * MARGIN + 1, span + 2 * MARGIN + 1, 3), 255, dtype=np.uint8)
+    if cell_size >= MIN_GRID_CELL:
+        grid = hex_to_rgb(GRID_COLOR)
+        for i in range(size + 1):
+            offset = MARGIN + i * cell_size
+            image[offset, MARGIN:MARGIN + span + 1] = grid
+            image[MARGIN:MARGIN + span + 1, offset] = grid
+    else:
+        border = hex_to_rgb(BORDER_COLOR)
+        for offset in (MARGIN, MARGIN + span):
+            image[offset, MARGIN:MARGIN + span + 1] = border
+            image[MARGIN:MARGIN + span + 1, offset] = border
+    half = path_line_width(cell_size) / 2
+    for color, path in (paths or {}).items():
+        coords = _as_coords(path)
+        if len(coords) < 2:
+            continue
+        rgb = hex_to_rgb(colors.get(color, UNKNOWN_COLOR))
+        centers = MARGIN + (_corners(coords) + 0.5) * cell_size
+        for (x1, y1), (x2, y2) in zip(centers[:-1], centers[1:]):
+            left = int(round(min(x1, x2) - half))
+            right = int(round(max(x1, x2) + half))
+            top = int(round(min(y1, y2) - half))
+            bottom = int(round(max(y1, y2) + half))
+            image[top:bottom, left:right] = rgb
+    radius = piece_radius(cell_size)
+    fill, ring, extent = _disk(radius)
+    outline = hex_to_rgb(PIECE_OUTLINE)
+    scale = int(radius * 0.8) // 5
+    for color, positions in pairs.items():
+        rgb = hex_to_rgb(colors.get(color, UNKNOWN_COLOR))
+        label = str(color)
+        for x, y in positions:
+            cx = int(MARGIN + (x + 0.5) * cell_size)
+            cy = int(MARGIN + (y + 0.5) * cell_size)
+            patch = image[cy - extent:cy + extent + 1, cx - extent:cx + extent + 1]
+            patch[fill] = rgb
+            patch[fill & ring] = outline
+            if scale >= MIN_LABEL_SCALE:
+                _stamp_label(image, label, cx, cy, scale)
+    return image
+
+def _stamp_label(image: np.ndarray, label: str, cx: int, cy: int, scale: int) -> None:
+    width = (4 * len(label) - 1) * scale
+    left = cx - width // 2
+    top = cy - 5 * scale // 2
+    for i, digit in enumerate(label):
+        mask = np.kron(DIGIT_MASKS[digit], np.ones((scale, scale), dtype=bool))
+        x0 = left + 4 * i * scale
+        image[top:top + 5 * scale, x0:x0 + 3 * scale][mask] = 255
+
+def encode_png(image: np.ndarray) -> bytes:
+    height, width, _ = image.shape
+    raw = np.zeros((height, width * 3 + 1), dtype=np.uint8)
+    raw[:, 1:] = image.reshape(height, -1)
+    def chunk(tag, data):
+        return struct.pack(">I", len(data)) + tag + data + struct.pack(">I", zlib.crc32(tag + data) & 0xffffffff)
+    header = struct.pack(">IIBBBBB", width, height, 8, 2, 0, 0, 0)
+    return b"\x89PNG\r\n\x1a\n" + chunk(b"IHDR", header) + chunk(b"IDAT", zlib.compress(raw.tobytes(), 6)) + chunk(b"IEND", b"")
+
+def render_svg(size: int, pairs: Dict[int, List[Tuple[int, int]]], paths: Optional[Dict] = None, cell_size: Optional[int] = None, colors: Optional[Dict[int, str]] = None) -> str:
+    cell_size = cell_size or default_cell_size(size)
+    colors = colors or board_colors(pairs)
+    span = size * cell_size
+    extent = span + 2 * MARGIN
+    parts = [f'<svg xmlns="http://www.w3.org/2000/svg" width="{extent}" height="{extent}" viewBox="0 0 {extent} {extent}">',
+             f'<rect width="{extent}" height="{extent}" fill="#ffffff"/>']
+    if cell_size >= MIN_GRID_CELL:
+        lines = []
+        for i in range(size + 1):
+            offset = MARGIN + i * cell_size
+            lines.append(f"M{MARGIN} {offset}H{MARGIN + span}M{offset} {MARGIN}V{MARGIN + span}")
+        parts.append(f'<path d="{"".join(lines)}" stroke="{GRID_COLOR}" fill="none"/>')
+    else:
+        parts.append(f'<rect x="{MARGIN}" y="{MARGIN}" width="{span}" height="{span}" stroke="{BORDER_COLOR}" fill="none"/>')
+    width = path_line_width(cell_size)
+    for color, path in (paths or {}).items():
+        coords = _as_coords(path)
+        if len(coords) < 2:
+            continue
+        centers = MARGIN + (_corners(coords) + 0.5) * cell_size
+        points = " ".join(f"{x:g},{y:g}" for x, y in centers)
+        parts.append(f'<polyline points="{points}" stroke="{colors.get(color, UNKNOWN_COLOR)}" stroke-width="{width}" '
+                     f'stroke-linecap="round" stroke-linejoin="round" fill="none"/>')
+    radius = piece_radius(cell_size)
+    for color, positions in pairs.items():
+        for x, y in positions:
+            cx = MARGIN + (x + 0.5) * cell_size
+            cy = MARGIN + (y + 0.5) * cell_size
+            parts.append(f'<circle cx="{cx:g}" cy="{cy:g}" r="{radius:g}" fill="{colors.get(color, UNKNOWN_COLOR)}" stroke="{PIECE_OUTLINE}" stroke-width="2"/>')
+            parts.append(f'<text x="{cx:g}" y="{cy:g}" fill="white" font-family="Arial" font-weight="bold" font-size="{int(radius * 0.8)}" '
+                         f'text-anchor="middle" dominant-baseline="central">{color}</text>')
+    parts.append("</svg>")
+    return "\n".join(parts)
+
+def render_file(filename: str, size: int, pairs: Dict[int, List[Tuple[int, int]]], paths: Optional[Dict] = None, cell_size: Optional[int] = None) -> str:
+    if filename.lower().endswith(".svg"):
+        with open(filename, "w", encoding="utf-8") as f:
+            f.write(render_svg(size, pairs, paths, cell_size))
+    else:
+        with open(filename, "wb") as f:
+            f.write(encode_png(rasterize_board(size, pairs, paths, cell_size)))
+    return filename
+
+def _render_job(job) -> str:
+    return render_file(*job)
+
+def render_store(store: str, out_dir: str, fmt: str = "png", statuses: Optional[List[str]] = None, run: Optional[int] = None, limit: Optional[int] = None, workers: Optional[int] = None, cell_size: Optional[int] = None, verbose: bool = True) -> int:
+    os.makedirs(out_dir, exist_ok=True)
+    records = open_records(store)
+    mask = np.ones(len(records), dtype=bool)
+    if statuses:
+        mask &= np.isin(records["status"], [STATUS_NAMES.index(status) for status in statuses])
+    if run is not None:
+        mask &= records["run"] == run
+    selected = np.flatnonzero(mask)[:limit]
+    blob = open_paths(store)
+    pairs_blob = open_pairs(store)
+    def jobs():
+        for index in selected:
+            record = records[index]
+            start = int(record["paths_offset"])
+            chains = unpack_paths(blob[start:start + int(record["paths_bytes"])])
+            pairs_start = int(record["pairs_offset"])
+            pairs = unpack_pairs(pairs_blob[pairs_start:pairs_start + int(record["pairs_bytes"])])
+            name = f"run{record['run']}_size{record['size']}_seed{record['seed']}_{STATUS_NAMES[record['status']]}.{fmt}"
+            yield os.path.join(out_dir, name), int(record["size"]), pairs, chains, cell_size
+    start_time = time.time()
+    if workers is not None and workers <= 1:
+        count = sum(1 for _ in map(_render_job, jobs()))
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            count = sum(1 for _ in pool.map(_render_job, jobs(), chunksize=32))
+    if verbose:
+        elapsed = time.time() - start_time
+        print(f"已渲染 {count} 张图片到 {out_dir}, 用时 {elapsed:.2f}秒 ({count / elapsed * 60 if elapsed > 0 else 0:.0f} 张/分钟)")
+    return count
+
+def main():
+    parser = argparse.ArgumentParser(description="无界面批量渲染结果存储中的棋盘和路径为PNG/SVG图片")
+    parser.add_argument("store", help="result_store.py生成的结果存储目录")
+    parser.add_argument("output", help="图片输出目录")
+    parser.add_argument("--format", choices=["png", "svg"], default="png", help="图片格式")
+    parser.add_argument("--status", choices=STATUS_NAMES, nargs="+", default=None, help="只渲染这些状态的结果，如 unsolved invalid")
+    parser.add_argument("--run", type=int, default=None, help="只渲染指定的批次")
+    parser.add_argument("--limit", type=int, default=None, help="最多渲染的图片数量")
+    parser.add_argument("--workers", type=int, default=None, help="渲染进程数 (默认为CPU核数)")
+    parser.add_argument("--cell-size", type=int, default=None, help="每个格子的像素大小 (默认与界面一致，大棋盘自动缩小)")
+    args = parser.parse_args()
+    render_store(args.store, args.output, args.format, args.status, args.run, args.limit, args.workers, args.cell_size)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,283 @@
+import argparse
+import os
+import struct
+import time
+import numpy as np
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, List, Optional, Tuple
+from utils import (create_board, add_pairs_to_board, solve_crossline, chain_cost,
+                   encode_paths, decode_paths, validate_solution, generate_solvable_puzzles)
+
+STORE_MAGIC = b"CLRESLT2"
+STORE_HEADER = struct.Struct("<8sII")
+PATH_ENTRY = struct.Struct("<HI")
+PAIR_ENTRY = struct.Struct("<HHHHH")
+RECORD_DTYPE = np.dtype([
+    ("run", "<u4"),
+    ("seed", "<i8"),
+    ("size", "<u2"),
+    ("pairs", "<u2"),
+    ("status", "u1"),
+    ("turning", "u1"),
+    ("engine", "u1"),
+    ("order", "u1"),
+    ("length", "<i4"),
+    ("turns", "<i4"),
+    ("cost", "<i4"),
+    ("reference_cost", "<i4"),
+    ("solve_time", "<f4"),
+    ("validate_time", "<f4"),
+    ("paths_offset", "<u8"),
+    ("paths_bytes", "<u4"),
+    ("pairs_offset", "<u8"),
+    ("pairs_bytes", "<u4"),
+])
+
+STATUS_NAMES = ["solved", "unsolved", "invalid", "error"]
+ENGINE_NAMES = ["astar", "lee", "turn"]
+ORDER_NAMES = ["static", "dynamic"]
+RECORDS_FILE = "records.bin"
+PATHS_FILE = "paths.bin"
+PAIRS_FILE = "pairs.bin"
+
+def pack_paths(chains: Dict[int, bytes]) -> bytes:
+    return b"".join(PATH_ENTRY.pack(color, len(chain)) + chain for color, chain in chains.items())
+
+def unpack_paths(blob) -> Dict[int, bytes]:
+    chains = {}
+    offset = 0
+    view = memoryview(blob)
+    while offset < len(view):
+        color, length = PATH_ENTRY.unpack_from(view, offset)
+        offset += PATH_ENTRY.size
+        chains[color] = bytes(view[offset:offset + length])
+        offset += length
+    return chains
+
+def pack_pairs(pairs: Dict[int, List[Tuple[int, int]]]) -> bytes:
+    return b"".join(PAIR_ENTRY.pack(color, *positions[0], *positions[1]) for color, positions in pairs.items() if len(positions) == 2)
+
+def unpack_pairs(blob) -> Dict[int, List[Tuple[int, int]]]:
+    pairs = {}
+    for color, x1, y1, x2, y2 in PAIR_ENTRY.iter_unpack(bytes(blob)):
+        pairs[color] = [(x1, y1), (x2, y2)]
+    return pairs
+
+class ResultWriter:
+    def __init__(self, directory: str, buffer_records: int = 1024):
+        os.makedirs(directory, exist_ok=True)
+        self.directory = directory
+        records_path = os.path.join(directory, RECORDS_FILE)
+        if not os.path.exists(records_path) or os.path.getsize(records_path) == 0:
+            with open(records_path, "wb") as f:
+                f.write(STORE_HEADER.pack(STORE_MAGIC, RECORD_DTYPE.itemsize, 0))
+        else:
+            _check_header(records_path)
+        complete = (os.path.getsize(records_path) - STORE_HEADER.size) // RECORD_DTYPE.itemsize
+        self._records = open(records_path, "r+b")
+        self._records.truncate(STORE_HEADER.size + complete * RECORD_DTYPE.itemsize)
+        self._records.seek(0, os.SEEK_END)
+        self._paths = open(os.path.join(directory, PATHS_FILE), "ab")
+        self._paths_offset = self._paths.tell()
+        self._pairs = open(os.path.join(directory, PAIRS_FILE), "ab")
+        self._pairs_offset = self._pairs.tell()
+        self._buffer = np.zeros(buffer_records, dtype=RECORD_DTYPE)
+        self._pending = 0
+        self.count = complete
+        self.run = int(open_records(directory)["run"].max()) + 1 if complete else 0
+
+    def append(self, seed: int, size: int, pairs: Dict[int, List[Tuple[int, int]]], status: str, chains: Optional[Dict[int, bytes]] = None, turning: bool = False, engine: str = "astar", order: str = "static", reference_cost: int = -1, solve_time: float = 0.0, validate_time: float = 0.0) -> int:
+        record = self._buffer[self._pending]
+        record["run"] = self.run
+        record["seed"] = seed
+        record["size"] = size
+        record["pairs"] = len(pairs)
+        blob = pack_pairs(pairs)
+        self._pairs.write(blob)
+        record["pairs_offset"] = self._pairs_offset
+        record["pairs_bytes"] = len(blob)
+        self._pairs_offset += len(blob)
+        record["status"] = STATUS_NAMES.index(status)
+        record["turning"] = turning
+        record["engine"] = ENGINE_NAMES.index(engine)
+        record["order"] = ORDER_NAMES.index(order)
+        record["reference_cost"] = reference_cost
+        record["solve_time"] = solve_time
+        record["validate_time"] = validate_time
+        if chains:
+            length = sum(chain_cost(chain) for chain in chains.values())
+            with_turns = sum(chain_cost(chain, True) for chain in chains.values())
+            record["length"] = length
+            record["turns"] = (with_turns - length) // 2
+            record["cost"] = with_turns if turning else length
+            blob = pack_paths(chains)
+            self._paths.write(blob)
+            record["paths_offset"] = self._paths_offset
+            record["paths_bytes"] = len(blob)
+            self._paths_offset += len(blob)
+        else:
+            record["length"] = record["turns"] = record["cost"] = -1
+            record["paths_offset"] = self._paths_offset
+            record["paths_bytes"] = 0
+        self._pending += 1
+        self.count += 1
+        if self._pending == len(self._buffer):
+            self.flush()
+        return self.count - 1
+
+    def flush(self) -> None:
+        self._paths.flush()
+        self._pairs.flush()
+        if self._pending:
+            self._records.write(self._buffer[:self._pending].tobytes())
+            self._pending = 0
+        self._records.flush()
+
+    def close(self) -> None:
+        if not self._records.closed:
+            self.flush()
+            self._records.close()
+            self._paths.close()
+            self._pairs.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+def _check_header(records_path: str) -> None:
+    with open(records_path, "rb") as f:
+        magic, record_size, _ = STORE_HEADER.unpack(f.read(STORE_HEADER.size))
+    if magic != STORE_MAGIC or record_size != RECORD_DTYPE.itemsize:
+        raise ValueError(f"不是有效的结果存储: {records_path}")
+
+def open_records(directory: str) -> np.ndarray:
+    records_path = os.path.join(directory, RECORDS_FILE)
+    _check_header(records_path)
+    count = (os.path.getsize(records_path) - STORE_HEADER.size) // RECORD_DTYPE.itemsize
+    if count == 0:
+        return np.zeros(0, dtype=RECORD_DTYPE)
+    return np.memmap(records_path, dtype=RECORD_DTYPE, mode="r", offset=STORE_HEADER.size, shape=(count,))
+
+def _open_blob(path: str) -> np.ndarray:
+    if os.path.getsize(path) == 0:
+        return np.zeros(0, dtype=np.uint8)
+    return np.memmap(path, dtype=np.uint8, mode="r")
+
+def open_paths(directory: str) -> np.ndarray:
+    return _open_blob(os.path.join(directory, PATHS_FILE))
+
+def open_pairs(directory: str) -> np.ndarray:
+    return _open_blob(os.path.join(directory, PAIRS_FILE))
+
+def load_paths(directory: str, record, blob: Optional[np.ndarray] = None) -> Dict[int, List[Tuple[int, int]]]:
+    if blob is None:
+        blob = open_paths(directory)
+    start = int(record["paths_offset"])
+    return decode_paths(unpack_paths(blob[start:start + int(record["paths_bytes"])]))
+
+def load_pairs(directory: str, record, blob: Optional[np.ndarray] = None) -> Dict[int, List[Tuple[int, int]]]:
+    if blob is None:
+        blob = open_pairs(directory)
+    start = int(record["pairs_offset"])
+    return unpack_pairs(blob[start:start + int(record["pairs_bytes"])])
+
+def summarize(records: np.ndarray) -> List[Dict]:
+    rows = []
+    keys = np.unique(records[["size", "turning", "engine", "order"]])
+    for key in keys:
+        mask = (records["size"] == key["size"]) & (records["turning"] == key["turning"]) & (records["engine"] == key["engine"]) & (records["order"] == key["order"])
+        subset = records[mask]
+        solved = subset[subset["status"] == 0]
+        known = solved[solved["reference_cost"] >= 0]
+        rows.append({
+            "size": int(key["size"]),
+            "turning": bool(key["turning"]),
+            "engine": ENGINE_NAMES[key["engine"]],
+            "order": ORDER_NAMES[key["order"]],
+            "count": len(subset),
+            "statuses": {name: int(np.count_nonzero(subset["status"] == i)) for i, name in enumerate(STATUS_NAMES)},
+            "solve_rate": len(solved) / len(subset),
+            "mean_cost": float(solved["cost"].mean()) if len(solved) else 0.0,
+            "mean_gap": float((known["cost"] - known["reference_cost"]).mean()) if len(known) else 0.0,
+            "p50_time": float(np.percentile(subset["solve_time"], 50)),
+            "p99_time": float(np.percentile(subset["solve_time"], 99)),
+        })
+    return rows
+
+def _solve_record(job) -> Tuple:
+    seed, size, pairs, reference_cost, turning, engine, order = job
+    board = add_pairs_to_board(create_board(size), pairs)
+    start_time = time.time()
+    try:
+        paths = solve_crossline(board, pairs, turning, False, order, engine=engine)
+    except Exception:
+        return seed, size, pairs, "error", {}, reference_cost, time.time() - start_time, 0.0
+    solve_time = time.time() - start_time
+    if not paths:
+        return seed, size, pairs, "unsolved", {}, reference_cost, solve_time, 0.0
+    start_time = time.time()
+    errors = validate_solution(board, pairs, paths)
+    status = "invalid" if errors else "solved"
+    return seed, size, pairs, status, encode_paths(paths), reference_cost, solve_time, time.time() - start_time
+
+def run_batch(directory: str, count: int, sizes: List[int], seed: int = 0, turning: bool = False, engine: str = "astar", order: str = "static", workers: int = 1, verbose: bool = True, **kwargs) -> int:
+    with ResultWriter(directory) as writer:
+        for size in sizes:
+            start_time = time.time()
+            jobs = ((puzzle["seed"], size, puzzle["pairs"], puzzle["cost_with_turns"] if turning else puzzle["cost"], turning, engine, order)
+                    for puzzle in generate_solvable_puzzles(count, size, seed, **kwargs))
+            if workers <= 1:
+                results = map(_solve_record, jobs)
+            else:
+                pool = ProcessPoolExecutor(max_workers=workers)
+                results = pool.map(_solve_record, jobs, chunksize=16)
+            try:
+                for result in results:
+                    seed_, size_, pairs, status, chains, reference_cost, solve_time, validate_time = result
+                    writer.append(seed_, size_, pairs, status, chains, turning, engine, order, reference_cost, solve_time, validate_time)
+            finally:
+                if workers > 1:
+                    pool.shutdown()
+            writer.flush()
+            if verbose:
+                print(f"棋盘 {size}x{size}: {count} 个谜题, 用时 {time.time() - start_time:.2f}秒")
+        return writer.run
+
+def print_summary(rows: List[Dict]) -> None:
+    for row in rows:
+        statuses = ", ".join(f"{name}={n}" for name, n in row["statuses"].items() if n)
+        print(f"{row['size']}x{row['size']} {row['engine']}/{row['order']}{' (含转向代价)' if row['turning'] else ''}: "
+              f"{row['count']} 条, 解出率={row['solve_rate']:.1%}, 平均代价={row['mean_cost']:.1f}, "
+              f"相对参考解={row['mean_gap']:+.2f}, p50={row['p50_time'] * 1000:.1f}ms, p99={row['p99_time'] * 1000:.1f}ms ({statuses})")
+
+def main():
+    parser = argparse.ArgumentParser(description="批量求解结果的内存映射列式存储")
+    parser.add_argument("store", help="结果存储目录")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    run_parser = subparsers.add_parser("run", help="生成谜题语料并批量求解，结果追加到存储")
+    run_parser.add_argument("--count", type=int, default=100, help="每种棋盘大小的谜题数量")
+    run_parser.add_argument("--sizes", type=int, nargs="+", default=[8, 16], help="棋盘大小列表")
+    run_parser.add_argument("--seed", type=int, default=0, help="语料的起始随机种子")
+    run_parser.add_argument("--turning_cost", action="store_true", help="是否考虑转向代价")
+    run_parser.add_argument("--engine", choices=ENGINE_NAMES, default="astar", help="搜索引擎")
+    run_parser.add_argument("--order", choices=ORDER_NAMES, default="static", help="颜色排序模式")
+    run_parser.add_argument("--workers", type=int, default=1, help="并行求解的进程数")
+    summary_parser = subparsers.add_parser("summary", help="按棋盘大小和配置汇总存储中的结果")
+    summary_parser.add_argument("--run", type=int, default=None, help="只汇总指定的批次")
+    args = parser.parse_args()
+    if args.command == "run":
+        run = run_batch(args.store, args.count, args.sizes, args.seed, args.turning_cost, args.engine, args.order, args.workers)
+        print(f"批次 {run} 已写入 {args.store}")
+    else:
+        records = open_records(args.store)
+        if args.run is not None:
+            records = records[records["run"] == args.run]
+        if not len(records):
+            print("存储中没有结果")
+            return
+        print_summary(summarize(records))
+
+if __name__ == "__main__":
+    main()
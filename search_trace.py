@@ -0,0 +1,139 @@
+import argparse
+import struct
+import numpy as np
+from typing import Dict, List, Tuple
+
+TRACE_MAGIC = b"CLTRACE1"
+TRACE_HEADER = struct.Struct("<8sHH")
+TRACE_RECORD = struct.Struct("<BBHHbBIf")
+TRACE_DTYPE = np.dtype([
+    ("event", "u1"),
+    ("direction", "u1"),
+    ("x", "<u2"),
+    ("y", "<u2"),
+    ("dir", "i1"),
+    ("pad", "u1"),
+    ("iteration", "<u4"),
+    ("g", "<f4"),
+])
+
+EVENT_POP = 0
+EVENT_PUSH = 1
+EVENT_MEET = 2
+EVENT_BEGIN = 3
+EVENT_TARGET = 4
+EVENT_NAMES = {EVENT_POP: "pop", EVENT_PUSH: "push", EVENT_MEET: "meet", EVENT_BEGIN: "begin", EVENT_TARGET: "target"}
+
+class SearchTraceRecorder:
+    def __init__(self, filename: str, buffer_records: int = 8192):
+        self.filename = filename
+        self._file = open(filename, "wb")
+        self._file.write(TRACE_HEADER.pack(TRACE_MAGIC, TRACE_RECORD.size, 0))
+        self._buffer = bytearray()
+        self._limit = buffer_records * TRACE_RECORD.size
+        self._pack = TRACE_RECORD.pack
+
+    def begin(self, size: int, start: Tuple[int, int], end: Tuple[int, int], color: int) -> None:
+        self._buffer += self._pack(EVENT_BEGIN, 0, start[0], start[1], -1, 0, color, size)
+        self._buffer += self._pack(EVENT_TARGET, 1, end[0], end[1], -1, 0, color, size)
+
+    def pop(self, direction: int, x: int, y: int, dir_idx: int, iteration: int, g: float) -> None:
+        self._buffer += self._pack(EVENT_POP, direction, x, y, dir_idx, 0, iteration, g)
+        if len(self._buffer) >= self._limit:
+            self.flush()
+
+    def push(self, direction: int, x: int, y: int, dir_idx: int, iteration: int, g: float) -> None:
+        self._buffer += self._pack(EVENT_PUSH, direction, x, y, dir_idx, 0, iteration, g)
+
+    def meet(self, direction: int, x: int, y: int, dir_idx: int, iteration: int, cost: float) -> None:
+        self._buffer += self._pack(EVENT_MEET, direction, x, y, dir_idx, 0, iteration, cost)
+
+    def flush(self) -> None:
+        if self._buffer:
+            self._file.write(self._buffer)
+            self._buffer = bytearray()
+        self._file.flush()
+
+    def close(self) -> None:
+        if not self._file.closed:
+            self.flush()
+            self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+def load_trace(filename: str) -> np.ndarray:
+    with open(filename, "rb") as f:
+        magic, record_size, _ = TRACE_HEADER.unpack(f.read(TRACE_HEADER.size))
+    if magic != TRACE_MAGIC or record_size != TRACE_DTYPE.itemsize:
+        raise ValueError(f"不是有效的搜索轨迹文件: {filename}")
+    return np.fromfile(filename, dtype=TRACE_DTYPE, offset=TRACE_HEADER.size)
+
+def split_searches(records: np.ndarray) -> List[np.ndarray]:
+    begins = np.flatnonzero(records["event"] == EVENT_BEGIN)
+    bounds = list(begins) + [len(records)]
+    return [records[bounds[i]:bounds[i + 1]] for i in range(len(begins))]
+
+def analyze_search(records: np.ndarray) -> Dict:
+    begin, target = records[0], records[1]
+    size = int(begin["g"])
+    events = records["event"]
+    directions = records["direction"]
+    report = {
+        "color": int(begin["iteration"]),
+        "size": size,
+        "start": (int(begin["x"]), int(begin["y"])),
+        "end": (int(target["x"]), int(target["y"])),
+    }
+    for direction, name in ((0, "forward"), (1, "backward")):
+        pops = records[(events == EVENT_POP) & (directions == direction)]
+        expansions = np.zeros((size, size), dtype=np.int64)
+        np.add.at(expansions, (pops["x"], pops["y"]), 1)
+        unique_cells = int(np.count_nonzero(expansions))
+        report[f"{name}_expansions"] = expansions
+        report[f"{name}_pops"] = len(pops)
+        report[f"{name}_revisit_ratio"] = len(pops) / unique_cells if unique_cells else 0.0
+        mine = records[directions == direction]
+        delta = np.where(mine["event"] == EVENT_PUSH, 1, np.where(mine["event"] == EVENT_POP, -1, 0))
+        report[f"{name}_frontier"] = 1 + np.cumsum(delta)[mine["event"] == EVENT_POP]
+    meets = records[events == EVENT_MEET]
+    report["meets"] = len(meets)
+    if len(meets):
+        last = meets[-1]
+        report["meeting_point"] = (int(last["x"]), int(last["y"]))
+        report["cost"] = float(last["g"])
+        report["iterations"] = int(records["iteration"].max())
+    else:
+        report["meeting_point"] = None
+        report["cost"] = None
+        report["iterations"] = int(records["iteration"].max()) if len(records) > 2 else 0
+    return report
+
+def analyze_trace(filename: str) -> List[Dict]:
+    return [analyze_search(segment) for segment in split_searches(load_trace(filename))]
+
+def print_report(report: Dict, top: int = 5) -> None:
+    print(f"颜色 {report['color']}: {report['start']} → {report['end']} (棋盘 {report['size']}x{report['size']})")
+    print(f"  迭代={report['iterations']}, 相遇事件={report['meets']}, 相遇点={report['meeting_point']}, 代价={report['cost']}")
+    for name, label in (("forward", "前向"), ("backward", "后向")):
+        frontier = report[f"{name}_frontier"]
+        peak = int(frontier.max()) if len(frontier) else 0
+        print(f"  {label}: 弹出={report[f'{name}_pops']}, 重访比={report[f'{name}_revisit_ratio']:.2f}, 最大前沿={peak}")
+    total = report["forward_expansions"] + report["backward_expansions"]
+    hottest = np.argsort(total, axis=None)[::-1][:top]
+    cells = [(int(i // report["size"]), int(i % report["size"]), int(total.flat[i])) for i in hottest if total.flat[i] > 0]
+    print(f"  热点格子: {', '.join(f'({x},{y})×{n}' for x, y, n in cells)}")
+
+def main():
+    parser = argparse.ArgumentParser(description="回放双向A*搜索轨迹文件")
+    parser.add_argument("trace", help="搜索轨迹文件")
+    parser.add_argument("--top", type=int, default=5, help="显示的热点格子数量")
+    args = parser.parse_args()
+    for report in analyze_trace(args.trace):
+        print_report(report, args.top)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,329 @@
+import argparse
+import asyncio
+import base64
+import json
+import os
+import socket
+import threading
+import time
+import numpy as np
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Dict, List, Optional, Tuple
+from utils import (create_board, add_pairs_to_board, solve_crossline,
+                   get_path_cost, validate_board_configuration, validate_solution,
+                   find_unsolvable_reason, encode_paths, decode_paths)
+
+DEFAULT_SOCKET = "/tmp/crossline.sock"
+
+def _warm_worker():
+    pairs = {1: [(0, 0), (2, 2)], 2: [(0, 2), (1, 2)]}
+    solve_crossline(add_pairs_to_board(create_board(4), pairs), pairs, False, False)
+
+def _solve_job(size: int, pairs: Dict[int, List[Tuple[int, int]]], with_turning_cost: bool, order_mode: str, deadline: float, epsilon: Optional[float] = None) -> Tuple[Dict[int, bytes], float, Optional[str], bool]:
+    start_time = time.time()
+    cancel_event = threading.Event()
+    timer = threading.Timer(deadline, cancel_event.set)
+    timer.start()
+    try:
+        reason = find_unsolvable_reason(create_board(size), pairs, cancel_event=cancel_event)
+        if reason:
+            return {}, time.time() - start_time, reason, False
+        board = add_pairs_to_board(create_board(size), pairs)
+        paths = solve_crossline(board, pairs, with_turning_cost, False, order_mode, cancel_event=cancel_event, epsilon=epsilon)
+    finally:
+        timer.cancel()
+    return encode_paths(paths), time.time() - start_time, None, not paths and cancel_event.is_set()
+
+def parse_puzzle(message: Dict) -> Tuple[int, Dict[int, List[Tuple[int, int]]]]:
+    size = int(message["size"])
+    if size <= 0:
+        raise ValueError("棋盘大小必须为正数")
+    pairs = {}
+    for color, positions in message["pairs"].items():
+        if len(positions) != 2:
+            raise ValueError(f"颜色 {color} 没有正好2个棋子")
+        pairs[int(color)] = [tuple(int(v) for v in pos) for pos in positions]
+    if not validate_board_configuration(create_board(size), pairs):
+        raise ValueError("棋盘配置无效")
+    return size, pairs
+
+class SolverService:
+    def __init__(self, workers: Optional[int] = None, queue_size: int = 64, default_deadline: float = 30.0, latency_window: int = 1000):
+        self.workers = workers or os.cpu_count() or 1
+        self.queue_size = queue_size
+        self.default_deadline = default_deadline
+        self.latencies = deque(maxlen=latency_window)
+        self.counters = {"received": 0, "solved": 0, "unsolved": 0, "unsolvable": 0, "invalid": 0, "timeout": 0, "rejected": 0, "error": 0}
+        self.started_at = time.time()
+        self.pool = None
+        self.queue = None
+        self.dispatchers = []
+        self.server = None
+
+    async def start(self, path: Optional[str] = None, host: Optional[str] = None, port: Optional[int] = None):
+        self.pool = self._create_pool()
+        self.queue = asyncio.Queue(maxsize=self.queue_size)
+        self.dispatchers = [asyncio.create_task(self._dispatch()) for _ in range(self.workers)]
+        if host is not None:
+            self.server = await asyncio.start_server(self._handle_client, host, port)
+        else:
+            path = path or DEFAULT_SOCKET
+            if os.path.exists(path):
+                os.unlink(path)
+            self.server = await asyncio.start_unix_server(self._handle_client, path)
+        self.started_at = time.time()
+        return self.server
+
+    def _create_pool(self) -> ProcessPoolExecutor:
+        return ProcessPoolExecutor(max_workers=self.workers, initializer=_warm_worker)
+
+    def _replace_broken_pool(self, broken: ProcessPoolExecutor):
+        if self.pool is broken:
+            broken.shutdown(wait=False, cancel_futures=True)
+            self.pool = self._create_pool()
+
+    async def stop(self):
+        if self.server is not None:
+            self.server.close()
+            await self.server.wait_closed()
+        for task in self.dispatchers:
+            task.cancel()
+        await asyncio.gather(*self.dispatchers, return_exceptions=True)
+        if self.pool is not None:
+            self.pool.shutdown(wait=False, cancel_futures=True)
+
+    async def _handle_client(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        write_lock = asyncio.Lock()
+        tasks = set()
+
+        async def reply(response):
+            async with write_lock:
+                writer.write(json.dumps(response, ensure_ascii=False).encode() + b"\n")
+                await writer.drain()
+
+        try:
+            while True:
+                line = await reader.readline()
+                if not line:
+                    break
+                if not line.strip():
+                    continue
+                task = asyncio.create_task(self._handle_line(line, reply))
+                tasks.add(task)
+                task.add_done_callback(tasks.discard)
+            if tasks:
+                await asyncio.gather(*tasks, return_exceptions=True)
+        except ConnectionError:
+            pass
+        finally:
+            writer.close()
+
+    async def _handle_line(self, line: bytes, reply):
+        try:
+            message = json.loads(line)
+        except ValueError as e:
+            await reply({"status": "error", "error": f"无效的JSON: {e}"})
+            return
+        if not isinstance(message, dict):
+            await reply({"status": "error", "error": "请求必须是JSON对象"})
+            return
+        try:
+            op = message.get("op", "solve")
+            if op == "health":
+                response = {"id": message.get("id"), "status": "ok", "workers": self.workers, "queue_depth": self.queue.qsize()}
+            elif op == "metrics":
+                response = {"id": message.get("id"), "status": "ok", **self.metrics()}
+            elif op == "solve":
+                response = await self.submit(message)
+            else:
+                response = {"id": message.get("id"), "status": "error", "error": f"未知操作: {op}"}
+        except Exception as e:
+            self.counters["error"] += 1
+            response = {"id": message.get("id"), "status": "error", "error": f"处理请求时发生错误: {e}"}
+        await reply(response)
+
+    async def submit(self, message: Dict) -> Dict:
+        self.counters["received"] += 1
+        request_id = message.get("id")
+        try:
+            size, pairs = parse_puzzle(message)
+            deadline = float(message.get("deadline", self.default_deadline))
+            if not 0 < deadline < float('inf'):
+                raise ValueError("截止时间必须为有限的正数")
+            epsilon = None if message.get("epsilon") is None else float(message["epsilon"])
+            if epsilon is not None and not epsilon >= 0:
+                raise ValueError("epsilon不能为负数")
+            order_mode = message.get("order_mode", "static")
+            if order_mode not in ("static", "dynamic"):
+                raise ValueError(f"未知的排序模式: {order_mode}")
+            path_format = message.get("path_format", "points")
+            if path_format not in ("points", "chain"):
+                raise ValueError(f"未知的路径格式: {path_format}")
+        except (AttributeError, KeyError, TypeError, ValueError) as e:
+            self.counters["error"] += 1
+            return {"id": request_id, "status": "error", "error": str(e)}
+        job = {
+            "size": size,
+            "pairs": pairs,
+            "turning_cost": bool(message.get("turning_cost", False)),
+            "order_mode": order_mode,
+            "epsilon": epsilon,
+            "path_format": path_format,
+            "enqueued_at": time.time(),
+            "deadline_at": time.time() + deadline,
+            "future": asyncio.get_running_loop().create_future(),
+        }
+        try:
+            self.queue.put_nowait(job)
+        except asyncio.QueueFull:
+            self.counters["rejected"] += 1
+            return {"id": request_id, "status": "rejected", "error": "队列已满", "queue_depth": self.queue.qsize()}
+        response = await job["future"]
+        response["id"] = request_id
+        return response
+
+    async def _dispatch(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            job = await self.queue.get()
+            try:
+                job["future"].set_result(await self._run_job(loop, job))
+            except Exception as e:
+                self.counters["error"] += 1
+                if not job["future"].done():
+                    job["future"].set_result({"status": "error", "error": str(e)})
+            finally:
+                self.queue.task_done()
+
+    async def _run_job(self, loop, job: Dict) -> Dict:
+        started_at = time.time()
+        queue_time = started_at - job["enqueued_at"]
+        remaining = job["deadline_at"] - started_at
+        if remaining <= 0:
+            self.counters["timeout"] += 1
+            return {"status": "timeout", "queue_time": queue_time}
+        args = (job["size"], job["pairs"], job["turning_cost"], job["order_mode"], remaining, job["epsilon"])
+        pool = self.pool
+        try:
+            future = loop.run_in_executor(pool, _solve_job, *args)
+        except BrokenProcessPool:
+            self._replace_broken_pool(pool)
+            pool = self.pool
+            future = loop.run_in_executor(pool, _solve_job, *args)
+        try:
+            chains, solve_time, reason, timed_out = await asyncio.wait_for(future, remaining)
+        except asyncio.TimeoutError:
+            self.counters["timeout"] += 1
+            return {"status": "timeout", "queue_time": queue_time, "total_time": time.time() - job["enqueued_at"]}
+        except BrokenProcessPool:
+            self._replace_broken_pool(pool)
+            self.counters["error"] += 1
+            return {"status": "error", "error": "工作进程异常退出，请重试", "queue_time": queue_time, "total_time": time.time() - job["enqueued_at"]}
+        total_time = time.time() - job["enqueued_at"]
+        if timed_out:
+            self.counters["timeout"] += 1
+            return {"status": "timeout", "queue_time": queue_time, "solve_time": solve_time, "total_time": total_time}
+        self.latencies.append(total_time)
+        if reason:
+            self.counters["unsolvable"] += 1
+            return {"status": "unsolvable", "reason": reason, "queue_time": queue_time, "solve_time": solve_time, "total_time": total_time}
+        if not chains:
+            self.counters["unsolved"] += 1
+            return {"status": "unsolved", "queue_time": queue_time, "solve_time": solve_time, "total_time": total_time}
+        paths = decode_paths(chains)
+        errors = validate_solution(create_board(job["size"]), job["pairs"], paths)
+        if errors:
+            self.counters["invalid"] += 1
+            return {"status": "invalid", "errors": errors, "queue_time": queue_time, "solve_time": solve_time, "total_time": total_time}
+        self.counters["solved"] += 1
+        if job["path_format"] == "chain":
+            encoded = {str(color): base64.b64encode(chain).decode() for color, chain in chains.items()}
+        else:
+            encoded = {str(color): [list(pos) for pos in path] for color, path in paths.items()}
+        return {
+            "status": "solved",
+            "path_format": job["path_format"],
+            "paths": encoded,
+            "cost": sum(get_path_cost(chain, job["turning_cost"]) for chain in chains.values()),
+            "queue_time": queue_time,
+            "solve_time": solve_time,
+            "total_time": total_time,
+        }
+
+    def metrics(self) -> Dict:
+        uptime = time.time() - self.started_at
+        completed = self.counters["solved"] + self.counters["unsolved"] + self.counters["unsolvable"] + self.counters["invalid"]
+        if self.latencies:
+            p50, p90, p99 = np.percentile(np.fromiter(self.latencies, dtype=float), [50, 90, 99])
+        else:
+            p50 = p90 = p99 = 0.0
+        return {
+            "uptime": uptime,
+            "workers": self.workers,
+            "queue_depth": self.queue.qsize(),
+            "queue_size": self.queue_size,
+            "counters": dict(self.counters),
+            "latency": {"p50": float(p50), "p90": float(p90), "p99": float(p99), "samples": len(self.latencies)},
+            "solve_rate": self.counters["solved"] / completed if completed else 0.0,
+            "throughput": completed / uptime if uptime > 0 else 0.0,
+        }
+
+async def serve(path: Optional[str] = None, host: Optional[str] = None, port: Optional[int] = None, workers: Optional[int] = None, queue_size: int = 64, default_deadline: float = 30.0):
+    service = SolverService(workers, queue_size, default_deadline)
+    server = await service.start(path, host, port)
+    where = f"{host}:{port}" if host is not None else (path or DEFAULT_SOCKET)
+    print(f"求解服务已启动: {where}, 工作进程={service.workers}, 队列上限={queue_size}")
+    try:
+        async with server:
+            await server.serve_forever()
+    finally:
+        await service.stop()
+
+def send_requests(messages: List[Dict], path: Optional[str] = None, host: Optional[str] = None, port: Optional[int] = None, timeout: Optional[float] = None) -> List[Dict]:
+    if host is not None:
+        conn = socket.create_connection((host, port), timeout=timeout)
+    else:
+        conn = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        conn.settimeout(timeout)
+        conn.connect(path or DEFAULT_SOCKET)
+    with conn, conn.makefile("rwb") as stream:
+        for index, message in enumerate(messages):
+            stream.write(json.dumps({**message, "id": index}, ensure_ascii=False).encode() + b"\n")
+        stream.flush()
+        responses = [None] * len(messages)
+        for _ in messages:
+            response = json.loads(stream.readline())
+            index = response["id"]
+            response["id"] = messages[index].get("id")
+            responses[index] = response
+    return responses
+
+def send_request(message: Dict, path: Optional[str] = None, host: Optional[str] = None, port: Optional[int] = None, timeout: Optional[float] = None) -> Dict:
+    return send_requests([message], path, host, port, timeout)[0]
+
+def main():
+    parser = argparse.ArgumentParser(description="交叉线游戏本地求解服务")
+    parser.add_argument("--socket", type=str, default=None, help=f"Unix套接字路径 (默认 {DEFAULT_SOCKET})")
+    parser.add_argument("--host", type=str, default=None, help="改用TCP监听的地址，如127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765, help="TCP端口")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    serve_parser = subparsers.add_parser("serve", help="启动求解服务")
+    serve_parser.add_argument("--workers", type=int, default=None, help="工作进程数量")
+    serve_parser.add_argument("--queue-size", type=int, default=64, help="等待队列的最大长度")
+    serve_parser.add_argument("--deadline", type=float, default=30.0, help="默认的请求截止时间(秒)")
+    request_parser = subparsers.add_parser("request", help="向服务发送一条JSON请求")
+    request_parser.add_argument("message", help="JSON请求，如 '{\"op\": \"metrics\"}'")
+    args = parser.parse_args()
+    if args.command == "serve":
+        try:
+            asyncio.run(serve(args.socket, args.host, args.port if args.host else None, args.workers, args.queue_size, args.deadline))
+        except KeyboardInterrupt:
+            print("求解服务已停止")
+    else:
+        response = send_request(json.loads(args.message), args.socket, args.host, args.port if args.host else None)
+        print(json.dumps(response, ensure_ascii=False, indent=2))
+
+if __name__ == "__main__":
+    main()
@@ -3,25 +3,22 @@ from tkinter import ttk, messagebox, scrolledtext, colorchooser
 import numpy as np
 import time
 import threading
-import colorsys
+import multiprocessing
 import itertools
+from collections import deque
 from utils import (create_board, add_pairs_to_board, solve_crossline, 
-                  get_path_cost, validate_board_configuration)
-
-CELL_SIZE = 50
-MARGIN = 20
-PIECE_RADIUS = 18
-LINE_WIDTH = 4
-MAX_COLORS = 20
-
-def generate_colors(n):
-    colors = {}
-    for i in range(1, n+1):
-        hue = (i-1)/n
-        r, g, b = colorsys.hsv_to_rgb(hue, 0.8, 0.9)
-        hex_color = f"#{int(r*255):02x}{int(g*255):02x}{int(b*255):02x}"
-        colors[i] = hex_color
-    return colors
+                  get_path_cost, validate_board_configuration, SearchWorkspace,
+                  find_unsolvable_reason, decompose_colors, solve_decomposed,
+                  generate_colors, piece_radius, path_line_width, CELL_SIZE, MARGIN, MAX_COLORS,
+                  GRID_COLOR, BORDER_COLOR, PIECE_OUTLINE, UNKNOWN_COLOR)
+
+MIN_LABEL_FONT = 6
+RESIZE_DELAY = 50
+LOG_CAPACITY = 2000
+LOG_FLUSH_INTERVAL = 100
+LOG_FILE = "crossline_ui.log"
+LOG_LEVELS = ["全部", "信息", "警告", "错误"]
+TAG_LEVELS = {"info": 1, "header": 1, "success": 1, "warning": 2, "error": 3}
 
 class CrossLineUI:
     def __init__(self, root):
@@ -39,14 +36,35 @@ class CrossLineUI:
         self.current_color = 1
         self.placing_first = True
         self.solving = False
+        self.cancel_event = None
+        self.solve_thread = None
         self.show_turns = tk.BooleanVar(value=False)
         self.detailed_output = tk.BooleanVar(value=True)
         self.grid_visible = tk.BooleanVar(value=True)
         self.auto_retry = tk.BooleanVar(value=True)
+        self.show_heatmap = tk.BooleanVar(value=False)
+        self.search_stats = None
+        self.search_stats_with_turns = None
         self.colors = generate_colors(MAX_COLORS)
+        self.cell_size = CELL_SIZE
+        self._resize_job = None
+        self._grid_items = []
+        self._grid_layout = None
+        self._heatmap_stats = None
+        self._heatmap_size = None
+        self._piece_items = {}
+        self._path_items = {}
+        self._drawn_paths = {}
+        self.log_level = tk.StringVar(value=LOG_LEVELS[0])
+        self.log_to_file = tk.BooleanVar(value=False)
+        self.log_lines = deque(maxlen=LOG_CAPACITY)
+        self._log_pending = deque(maxlen=LOG_CAPACITY)
+        self._log_lock = threading.Lock()
+        self._log_file = None
         self._create_widgets()
         self._create_bindings()
         self.reset_board()
+        self.root.after(LOG_FLUSH_INTERVAL, self._flush_log)
 
     def _create_widgets(self):
         self.root.configure(bg="#f0f0f0")
@@ -57,7 +75,7 @@ class CrossLineUI:
         size_frame = ttk.Frame(control_frame)
         size_frame.pack(fill=tk.X, padx=5, pady=5)
         ttk.Label(size_frame, text="棋盘大小:").pack(side=tk.LEFT)
-        size_spinner = ttk.Spinbox(size_frame, from_=4, to=20, textvariable=self.board_size, width=5)
+        size_spinner = ttk.Spinbox(size_frame, from_=4, to=100, textvariable=self.board_size, width=5)
         size_spinner.pack(side=tk.LEFT, padx=5)
         button_frame = ttk.Frame(control_frame)
         button_frame.pack(fill=tk.X, padx=5, pady=5)
@@ -97,8 +115,12 @@ class CrossLineUI:
         grid_check.pack(fill=tk.X, padx=5, pady=5)
         retry_check = ttk.Checkbutton(options_frame, text="自动尝试所有顺序", variable=self.auto_retry)
         retry_check.pack(fill=tk.X, padx=5, pady=5)
+        heatmap_check = ttk.Checkbutton(options_frame, text="显示扩展热力图", variable=self.show_heatmap, command=self.draw_board)
+        heatmap_check.pack(fill=tk.X, padx=5, pady=5)
         solve_button = ttk.Button(control_frame, text="求解", command=self.solve_game, style="Accent.TButton")
-        solve_button.pack(fill=tk.X, padx=5, pady=10)
+        solve_button.pack(fill=tk.X, padx=5, pady=(10, 2))
+        stop_button = ttk.Button(control_frame, text="停止求解", command=self.cancel_solve)
+        stop_button.pack(fill=tk.X, padx=5, pady=(2, 10))
         self.style.configure("Accent.TButton", font=("Arial", 10, "bold"))
         progress_frame = ttk.Frame(control_frame)
         progress_frame.pack(fill=tk.X, padx=5, pady=5)
@@ -116,6 +138,14 @@ class CrossLineUI:
         self.canvas.pack(fill=tk.BOTH, expand=True)
         output_frame = ttk.LabelFrame(right_frame, text="输出信息", padding="5")
         output_frame.pack(fill=tk.X, padx=5, pady=5)
+        log_options = ttk.Frame(output_frame)
+        log_options.pack(fill=tk.X, padx=5)
+        ttk.Label(log_options, text="日志级别:").pack(side=tk.LEFT)
+        level_box = ttk.Combobox(log_options, textvariable=self.log_level, values=LOG_LEVELS, state="readonly", width=6)
+        level_box.pack(side=tk.LEFT, padx=5)
+        level_box.bind("<<ComboboxSelected>>", lambda event: self._render_log())
+        file_check = ttk.Checkbutton(log_options, text=f"完整日志写入{LOG_FILE}", variable=self.log_to_file, command=self.toggle_log_file)
+        file_check.pack(side=tk.LEFT, padx=5)
         self.output_text = scrolledtext.ScrolledText(output_frame, height=10, font=("Consolas", 10))
         self.output_text.pack(fill=tk.BOTH, expand=True, padx=5, pady=5)
         self.output_text.tag_configure("success", foreground="#009900")
@@ -127,14 +157,17 @@ class CrossLineUI:
     def _create_bindings(self):
         self.canvas.bind("<Button-1>", self.on_canvas_click)
         self.canvas.bind("<Button-3>", self.on_canvas_right_click)
-        self.canvas.bind("<Configure>", self.draw_board)
+        self.canvas.bind("<Configure>", self.on_canvas_resize)
 
     def reset_board(self):
+        self.cancel_solve()
         size = self.board_size.get()
         self.board = create_board(size)
         self.pairs = {}
         self.paths = None
         self.paths_with_turns = None
+        self.search_stats = None
+        self.search_stats_with_turns = None
         self.current_color = 1
         self.placing_first = True
         self.update_color_display()
@@ -144,74 +177,184 @@ class CrossLineUI:
         self.log("棋盘已重置，大小为 {} x {}".format(size, size), "header")
 
     def clear_output(self):
+        with self._log_lock:
+            self.log_lines.clear()
+            self._log_pending.clear()
         self.output_text.delete(1.0, tk.END)
 
+    def toggle_log_file(self):
+        with self._log_lock:
+            if self.log_to_file.get() and self._log_file is None:
+                self._log_file = open(LOG_FILE, "a", encoding="utf-8")
+            elif not self.log_to_file.get() and self._log_file is not None:
+                self._log_file.close()
+                self._log_file = None
+
+    def on_canvas_resize(self, event):
+        if self._resize_job is not None:
+            self.root.after_cancel(self._resize_job)
+        self._resize_job = self.root.after(RESIZE_DELAY, self._apply_resize)
+
+    def _apply_resize(self):
+        self._resize_job = None
+        self.draw_board()
+
+    def _update_cell_size(self, size):
+        width = self.canvas.winfo_width()
+        height = self.canvas.winfo_height()
+        if width > 2 * MARGIN and height > 2 * MARGIN:
+            self.cell_size = (min(width, height) - 2 * MARGIN) / size
+        else:
+            self.cell_size = CELL_SIZE
+
+    def _cell_center(self, pos):
+        return MARGIN + (pos[0] + 0.5) * self.cell_size, MARGIN + (pos[1] + 0.5) * self.cell_size
+
     def draw_board(self, event=None):
         if self.board is None:
             return
-        self.canvas.delete("all")
         size = self.board_size.get()
-        if event:
-            canvas_width = event.width
-            canvas_height = event.height
-            board_size = min(canvas_width, canvas_height) - 2 * MARGIN
-            self.cell_size = board_size / size
-        else:
-            self.cell_size = CELL_SIZE
-        if self.grid_visible.get():
-            for i in range(size + 1):
-                y = MARGIN + i * self.cell_size
-                self.canvas.create_line(MARGIN, y, MARGIN + size * self.cell_size, y, fill="#DDDDDD")
-                x = MARGIN + i * self.cell_size
-                self.canvas.create_line(x, MARGIN, x, MARGIN + size * self.cell_size, fill="#DDDDDD")
-        else:
-            self.canvas.create_rectangle(MARGIN, MARGIN, MARGIN + size * self.cell_size, MARGIN + size * self.cell_size, outline="#AAAAAA")
+        old_cell_size = self.cell_size
+        self._update_cell_size(size)
+        self.draw_grid(size)
+        stats = None
+        if self.show_heatmap.get():
+            if self.show_turns.get() and self.search_stats_with_turns:
+                stats = self.search_stats_with_turns
+            elif self.search_stats:
+                stats = self.search_stats
+        if stats is not self._heatmap_stats or size != self._heatmap_size:
+            self.canvas.delete("heatmap")
+            self._heatmap_stats = stats
+            self._heatmap_size = size
+            if stats:
+                self.draw_heatmap(stats)
+        elif stats and self.cell_size != old_cell_size:
+            ratio = self.cell_size / old_cell_size
+            self.canvas.scale("heatmap", MARGIN, MARGIN, ratio, ratio)
         if self.show_turns.get() and self.paths_with_turns:
             self.draw_paths(self.paths_with_turns)
-        elif self.paths:
-            self.draw_paths(self.paths)
+        else:
+            self.draw_paths(self.paths or {})
+        wanted = {}
         for color, positions in self.pairs.items():
             for pos in positions:
-                self.draw_piece(pos, color)
+                wanted[pos] = color
+        for pos in list(self._piece_items):
+            if wanted.get(pos) != self._piece_items[pos][2]:
+                oval, text, _, _ = self._piece_items.pop(pos)
+                self.canvas.delete(oval, text)
+        for pos, color in wanted.items():
+            self.draw_piece(pos, color)
+
+    def draw_grid(self, size):
+        layout = (size, self.cell_size, self.grid_visible.get())
+        if layout == self._grid_layout:
+            return
+        span = size * self.cell_size
+        if self.grid_visible.get():
+            lines = []
+            for i in range(size + 1):
+                offset = MARGIN + i * self.cell_size
+                lines.append((MARGIN, offset, MARGIN + span, offset))
+                lines.append((offset, MARGIN, offset, MARGIN + span))
+        else:
+            lines = [(MARGIN, MARGIN, MARGIN + span, MARGIN + span)]
+        if self._grid_layout is None or layout[::2] != self._grid_layout[::2]:
+            self.canvas.delete("grid")
+            if self.grid_visible.get():
+                self._grid_items = [self.canvas.create_line(*line, fill=GRID_COLOR, tags="grid") for line in lines]
+            else:
+                self._grid_items = [self.canvas.create_rectangle(*lines[0], outline=BORDER_COLOR, tags="grid")]
+            self.canvas.tag_lower("grid")
+        else:
+            for item, line in zip(self._grid_items, lines):
+                self.canvas.coords(item, *line)
+        self._grid_layout = layout
+
+    def draw_heatmap(self, stats):
+        counts = stats["forward_expansions"] + stats["backward_expansions"]
+        if counts.shape[0] != self.board_size.get():
+            return
+        peak = counts.max()
+        if peak <= 0:
+            return
+        for x, y in zip(*np.nonzero(counts)):
+            level = counts[x, y] / peak
+            shade = int(255 - 200 * level)
+            fill = f"#ff{shade:02x}{shade:02x}"
+            self.canvas.create_rectangle(MARGIN + x * self.cell_size, MARGIN + y * self.cell_size,
+                                       MARGIN + (x + 1) * self.cell_size, MARGIN + (y + 1) * self.cell_size,
+                                       fill=fill, outline="", tags="heatmap")
+        mark = max(3, self.cell_size * 0.15)
+        for point in stats["meeting_points"].values():
+            if point is None:
+                continue
+            cx = MARGIN + (point[0] + 0.5) * self.cell_size
+            cy = MARGIN + (point[1] + 0.5) * self.cell_size
+            self.canvas.create_polygon(cx, cy - mark, cx + mark, cy, cx, cy + mark, cx - mark, cy,
+                                     fill="#000000", outline="", tags="heatmap")
+        self.canvas.tag_lower("heatmap")
+        self.canvas.tag_lower("grid")
 
     def draw_piece(self, pos, color):
         x, y = pos
-        cx = MARGIN + (x + 0.5) * self.cell_size
-        cy = MARGIN + (y + 0.5) * self.cell_size
-        piece_radius = min(self.cell_size * 0.4, PIECE_RADIUS)
-        self.canvas.create_oval(cx - piece_radius, cy - piece_radius,
-                              cx + piece_radius, cy + piece_radius,
-                              fill=self.colors.get(color, "#888888"), 
-                              outline="#333333",
-                              width=2,
-                              tags=(f"piece_{x}_{y}", f"color_{color}"))
-        self.canvas.create_text(cx, cy, text=str(color), fill="white", 
-                              font=("Arial", int(piece_radius*0.8), "bold"),
-                              tags=(f"text_{x}_{y}", f"color_{color}"))
+        cx, cy = self._cell_center(pos)
+        radius = piece_radius(self.cell_size)
+        fill = self.colors.get(color, UNKNOWN_COLOR)
+        font_size = int(radius * 0.8)
+        if pos in self._piece_items:
+            oval, text, _, drawn = self._piece_items[pos]
+            if drawn == (self.cell_size, fill):
+                return
+            self.canvas.coords(oval, cx - radius, cy - radius, cx + radius, cy + radius)
+            self.canvas.itemconfigure(oval, fill=fill)
+            self.canvas.coords(text, cx, cy)
+        else:
+            oval = self.canvas.create_oval(cx - radius, cy - radius,
+                                         cx + radius, cy + radius,
+                                         fill=fill, 
+                                         outline=PIECE_OUTLINE,
+                                         width=2,
+                                         tags=("piece", f"piece_{x}_{y}", f"color_{color}"))
+            text = self.canvas.create_text(cx, cy, text=str(color), fill="white", 
+                                         tags=("piece", f"text_{x}_{y}", f"color_{color}"))
+        self.canvas.itemconfigure(text, font=("Arial", max(1, font_size), "bold"),
+                                  state=tk.NORMAL if font_size >= MIN_LABEL_FONT else tk.HIDDEN)
+        self._piece_items[pos] = (oval, text, color, (self.cell_size, fill))
 
     def draw_paths(self, paths):
+        line_width = path_line_width(self.cell_size)
+        for color in list(self._path_items):
+            if len(paths.get(color, ())) < 2:
+                self.canvas.delete(self._path_items.pop(color))
+                del self._drawn_paths[color]
+        created = False
         for color, path in paths.items():
             if len(path) < 2:
                 continue
-            color_hex = self.colors.get(color, "#888888")
-            for i in range(len(path) - 1):
-                x1, y1 = path[i]
-                x2, y2 = path[i + 1]
-                cx1 = MARGIN + (x1 + 0.5) * self.cell_size
-                cy1 = MARGIN + (y1 + 0.5) * self.cell_size
-                cx2 = MARGIN + (x2 + 0.5) * self.cell_size
-                cy2 = MARGIN + (y2 + 0.5) * self.cell_size
-                line_width = max(2, min(LINE_WIDTH, int(self.cell_size * 0.1)))
-                self.canvas.create_line(cx1, cy1, cx2, cy2, 
-                                      fill=color_hex, 
-                                      width=line_width,
-                                      capstyle=tk.ROUND,
-                                      joinstyle=tk.ROUND,
-                                      tags=f"path_{color}")
+            color_hex = self.colors.get(color, UNKNOWN_COLOR)
+            drawn = self._drawn_paths.get(color)
+            if drawn is not None and drawn[1:] == (self.cell_size, color_hex) and drawn[0] == path:
+                continue
+            coords = [value for pos in path for value in self._cell_center(pos)]
+            if color in self._path_items:
+                item = self._path_items[color]
+                self.canvas.coords(item, *coords)
+                self.canvas.itemconfigure(item, fill=color_hex, width=line_width)
+            else:
+                self._path_items[color] = self.canvas.create_line(*coords, 
+                                                                fill=color_hex, 
+                                                                width=line_width,
+                                                                capstyle=tk.ROUND,
+                                                                joinstyle=tk.ROUND,
+                                                                tags=("path", f"path_{color}"))
+                created = True
+            self._drawn_paths[color] = (path, self.cell_size, color_hex)
+        if created:
+            self.canvas.tag_raise("piece")
 
     def on_canvas_click(self, event):
-        if self.solving:
-            return
         size = self.board_size.get()
         x = (event.x - MARGIN) / self.cell_size
         y = (event.y - MARGIN) / self.cell_size
@@ -220,8 +363,6 @@ class CrossLineUI:
             self.place_piece((grid_x, grid_y))
 
     def on_canvas_right_click(self, event):
-        if self.solving:
-            return
         size = self.board_size.get()
         x = (event.x - MARGIN) / self.cell_size
         y = (event.y - MARGIN) / self.cell_size
@@ -239,6 +380,7 @@ class CrossLineUI:
                 break
         if found_color is None:
             return
+        self.cancel_solve()
         if len(self.pairs[found_color]) == 1:
             del self.pairs[found_color]
             self.log(f"删除了颜色 {found_color} 的棋子 {pos}", "info")
@@ -254,6 +396,8 @@ class CrossLineUI:
         self.board = add_pairs_to_board(create_board(self.board_size.get()), self.pairs)
         self.paths = None
         self.paths_with_turns = None
+        self.search_stats = None
+        self.search_stats_with_turns = None
         self.draw_board()
 
     def place_piece(self, pos):
@@ -261,6 +405,7 @@ class CrossLineUI:
             if pos in positions:
                 self.log(f"位置 {pos} 已经被棋子占据", "error")
                 return
+        self.cancel_solve()
         if self.current_color not in self.pairs:
             self.pairs[self.current_color] = []
         current_pair = self.pairs.get(self.current_color, [])
@@ -280,6 +425,8 @@ class CrossLineUI:
         self.board = add_pairs_to_board(create_board(self.board_size.get()), self.pairs)
         self.paths = None
         self.paths_with_turns = None
+        self.search_stats = None
+        self.search_stats_with_turns = None
         self.draw_board()
         
     def update_color_display(self):
@@ -325,104 +472,113 @@ class CrossLineUI:
         if not validate_board_configuration(self.board, self.pairs):
             messagebox.showerror("错误", "棋盘配置无效")
             return
+        self.cancel_solve()
         self.log("\n开始求解...", "header")
         self.solving = True
+        self.paths = None
+        self.paths_with_turns = None
         self.progress["value"] = 0
         self.progress_var.set("0%")
-        threading.Thread(target=self._solve_in_thread).start()
+        self.cancel_event = threading.Event()
+        board = self.board.copy()
+        pairs = {color: list(positions) for color, positions in self.pairs.items()}
+        self.solve_thread = threading.Thread(target=self._solve_in_thread, args=(self.cancel_event, board, pairs), daemon=True)
+        self.solve_thread.start()
+
+    def cancel_solve(self):
+        if not self.solving or self.cancel_event is None:
+            return
+        self.cancel_event.set()
+        self.solving = False
+        self.log("求解已取消", "warning")
+        self._update_progress(0)
 
-    def _solve_in_thread(self):
+    def _solve_in_thread(self, cancel_event, board, pairs):
         try:
             verbose = self.detailed_output.get()
             with_turns = self.show_turns.get()
             auto_retry = self.auto_retry.get()
+            reason = find_unsolvable_reason(board, pairs, True if auto_retry and len(pairs) <= 8 else None, cancel_event)
+            if cancel_event.is_set():
+                return
+            if reason:
+                self.log(f"预检查: 棋盘无解 — {reason}", "error")
+                return
             self.log("\n不考虑转向代价的解:", "header")
-            self.paths = None
-            if auto_retry:
-                colors = list(self.pairs.keys())
-                if len(colors) > 8:
-                    self.log("棋子对数量过多，使用优化顺序而非尝试所有排列", "warning")
-                    start_time = time.time()
-                    self.paths = solve_crossline(self.board, self.pairs, False, verbose)
-                    time_taken = time.time() - start_time
-                    self.root.after(0, lambda: self._display_solution(self.paths, False, time_taken))
-                else:
-                    permutations = list(itertools.permutations(colors))
-                    total = len(permutations)
-                    self.log(f"尝试所有可能的连接顺序 (共{total}种排列)", "info")
-                    for i, perm in enumerate(permutations):
-                        progress = int((i / total) * 100)
-                        self.root.after(0, lambda p=progress: self._update_progress(p))
-                        self.log(f"\n尝试排列 {i+1}/{total}: {perm}", "info")
-                        start_time = time.time()
-                        sorted_colors = list(perm)
-                        curr_paths = self._try_solve_with_order(sorted_colors, False, verbose)
-                        time_taken = time.time() - start_time
-                        if curr_paths:
-                            self.log("找到有效解决方案!", "success")
-                            self.paths = curr_paths
-                            self.root.after(0, lambda: self._display_solution(self.paths, False, time_taken))
-                            break
-                        else:
-                            self.log("此顺序无法求解", "warning")
-                    if not self.paths:
-                        self.log("\n在尝试所有排列后仍未找到解决方案", "error")
-                        self.root.after(0, lambda: self._update_progress(100))
-            else:
-                start_time = time.time()
-                self.paths = solve_crossline(self.board, self.pairs, False, verbose)
-                time_taken = time.time() - start_time
-                self.root.after(0, lambda: self._display_solution(self.paths, False, time_taken))
-            if with_turns:
+            self._solve_mode(cancel_event, board, pairs, False, auto_retry, verbose)
+            if with_turns and not cancel_event.is_set():
                 self.log("\n考虑转向代价的解:", "header")
-                self.paths_with_turns = None
-                if auto_retry:
-                    colors = list(self.pairs.keys())
-                    if len(colors) > 8:
-                        self.log("棋子对数量过多，使用优化顺序而非尝试所有排列", "warning")
-                        start_time = time.time()
-                        self.paths_with_turns = solve_crossline(self.board, self.pairs, True, verbose)
-                        time_taken = time.time() - start_time
-                        self.root.after(0, lambda: self._display_solution(self.paths_with_turns, True, time_taken))
-                    else:
-                        permutations = list(itertools.permutations(colors))
-                        total = len(permutations)
-                        self.log(f"尝试所有可能的连接顺序 (考虑转向代价) (共{total}种排列)", "info")
-                        for i, perm in enumerate(permutations):
-                            progress = int((i / total) * 100)
-                            self.root.after(0, lambda p=progress: self._update_progress(p))
-                            self.log(f"\n尝试排列 {i+1}/{total}: {perm}", "info")
-                            start_time = time.time()
-                            sorted_colors = list(perm)
-                            curr_paths = self._try_solve_with_order(sorted_colors, True, verbose)
-                            time_taken = time.time() - start_time
-                            if curr_paths:
-                                self.log("找到有效解决方案!", "success")
-                                self.paths_with_turns = curr_paths
-                                self.root.after(0, lambda: self._display_solution(self.paths_with_turns, True, time_taken))
-                                break
-                            else:
-                                self.log("此顺序无法求解", "warning")
-                        if not self.paths_with_turns:
-                            self.log("\n在尝试所有排列后仍未找到解决方案 (含转向代价)", "error")
-                            self.root.after(0, lambda: self._update_progress(100))
-                else:
-                    start_time = time.time()
-                    self.paths_with_turns = solve_crossline(self.board, self.pairs, True, verbose)
-                    time_taken = time.time() - start_time
-                    self.root.after(0, lambda: self._display_solution(self.paths_with_turns, True, time_taken))
+                self._solve_mode(cancel_event, board, pairs, True, auto_retry, verbose)
         except Exception as e:
             self.log(f"求解过程中发生错误: {e}", "error")
         finally:
-            self.solving = False
-            self.root.after(0, lambda: self._update_progress(100))
+            self.root.after(0, lambda: self._finish_solve(cancel_event))
+
+    def _solve_mode(self, cancel_event, board, pairs, with_turning_cost, auto_retry, verbose):
+        suffix = " (含转向代价)" if with_turning_cost else ""
+        colors = list(pairs.keys())
+        if auto_retry and len(colors) <= 8:
+            permutations = list(itertools.permutations(colors))
+            total = len(permutations)
+            self.log(f"尝试所有可能的连接顺序{' (考虑转向代价)' if with_turning_cost else ''} (共{total}种排列)", "info")
+            workspace = SearchWorkspace(board.shape[0])
+            for i, perm in enumerate(permutations):
+                if cancel_event.is_set():
+                    return
+                progress = int((i / total) * 100)
+                self.root.after(0, lambda p=progress: self._update_progress(p))
+                self.log(f"\n尝试排列 {i+1}/{total}: {perm}", "info")
+                start_time = time.time()
+                stats = {}
+                curr_paths = self._try_solve_with_order(board, pairs, list(perm), with_turning_cost, verbose, stats, cancel_event, workspace)
+                time_taken = time.time() - start_time
+                if curr_paths:
+                    self.log("找到有效解决方案!", "success")
+                    self.root.after(0, lambda: self._publish_solution(cancel_event, curr_paths, stats, with_turning_cost, time_taken))
+                    return
+                if cancel_event.is_set():
+                    return
+                self.log("此顺序无法求解", "warning")
+            self.log(f"\n在尝试所有排列后仍未找到解决方案{suffix}", "error")
+            self.root.after(0, lambda: self._publish_solution(cancel_event, {}, stats, with_turning_cost, None))
+            return
+        start_time = time.time()
+        stats = {}
+        if auto_retry:
+            groups = decompose_colors(board, pairs)
+            self.log(f"棋子对数量过多，分解为 {len(groups)} 个独立子问题并行求解 (各组颜色数: {[len(group) for group in groups]})", "warning")
+            paths = solve_decomposed(board, pairs, with_turning_cost, verbose, cancel_event=cancel_event, groups=groups)
+        else:
+            paths = solve_crossline(board, pairs, with_turning_cost, verbose, stats=stats, cancel_event=cancel_event)
+        time_taken = time.time() - start_time
+        self.root.after(0, lambda: self._publish_solution(cancel_event, paths, stats, with_turning_cost, time_taken))
+
+    def _publish_solution(self, cancel_event, paths, stats, with_turns, time_taken):
+        if cancel_event.is_set():
+            return
+        if with_turns:
+            self.paths_with_turns = paths or None
+            self.search_stats_with_turns = stats
+        else:
+            self.paths = paths or None
+            self.search_stats = stats
+        if time_taken is None:
+            self.draw_board()
+        else:
+            self._display_solution(paths, with_turns, time_taken)
+
+    def _finish_solve(self, cancel_event):
+        if cancel_event is not self.cancel_event or cancel_event.is_set():
+            return
+        self.solving = False
+        self._update_progress(100)
 
-    def _try_solve_with_order(self, sorted_colors, with_turning_cost, verbose):
+    def _try_solve_with_order(self, board, pairs, sorted_colors, with_turning_cost, verbose, stats=None, cancel_event=None, workspace=None):
         try:
             from utils import bidirectional_astar_search
             import numpy as np
-            board_copy = self.board.copy()
-            pairs_copy = {k: v.copy() for k, v in self.pairs.items()}
+            board_copy = board.copy()
+            pairs_copy = {k: v.copy() for k, v in pairs.items()}
             size = board_copy.shape[0]
             occupied_cells = set()
             for color, positions in pairs_copy.items():
@@ -440,9 +596,10 @@ class CrossLineUI:
                 start, end = pairs_copy[color]
                 path = bidirectional_astar_search(board_copy, start, end, 
                                                 used_cells - {start, end}, 
-                                                with_turning_cost, color, verbose, used_edges)
+                                                with_turning_cost, color, verbose, used_edges, stats=stats,
+                                                cancel_event=cancel_event, workspace=workspace)
                 if not path:
-                    if verbose:
+                    if verbose and not (cancel_event is not None and cancel_event.is_set()):
                         self.log(f"无法为颜色 {color} 找到路径，尝试其他顺序", "warning")
                     return {}
                 if len(path) < 2 or path[0] != start or path[-1] != end:
@@ -506,13 +663,50 @@ class CrossLineUI:
         self.draw_board()
 
     def log(self, message, tag=None):
-        self.output_text.insert(tk.END, message + "\n", tag)
+        with self._log_lock:
+            self.log_lines.append((message, tag))
+            self._log_pending.append((message, tag))
+            if self._log_file is not None:
+                self._log_file.write(message + "\n")
+
+    def _visible_lines(self, lines):
+        level = LOG_LEVELS.index(self.log_level.get())
+        chunks = []
+        for message, tag in lines:
+            if TAG_LEVELS.get(tag, 0) >= level:
+                chunks.extend((message + "\n", tag or ()))
+        return chunks
+
+    def _write_log(self, chunks):
+        if not chunks:
+            return
+        self.output_text.insert(tk.END, *chunks)
+        lines = int(self.output_text.index("end-1c").split(".")[0])
+        if lines > LOG_CAPACITY:
+            self.output_text.delete("1.0", f"{lines - LOG_CAPACITY + 1}.0")
         self.output_text.see(tk.END)
 
+    def _flush_log(self):
+        with self._log_lock:
+            pending = list(self._log_pending)
+            self._log_pending.clear()
+            if self._log_file is not None:
+                self._log_file.flush()
+        self._write_log(self._visible_lines(pending))
+        self.root.after(LOG_FLUSH_INTERVAL, self._flush_log)
+
+    def _render_log(self):
+        with self._log_lock:
+            lines = list(self.log_lines)
+            self._log_pending.clear()
+        self.output_text.delete(1.0, tk.END)
+        self._write_log(self._visible_lines(lines))
+
 def main():
     root = tk.Tk()
     app = CrossLineUI(root)
     root.mainloop()
 
 if __name__ == "__main__":
+    multiprocessing.freeze_support()
     main()
\ No newline at end of file
@@ -1,11 +1,43 @@
+import colorsys
 import heapq
+from array import array
+import itertools
+import multiprocessing
+import os
+import queue
+import struct
 import numpy as np
 import time
 from typing import List, Tuple, Dict, Set, Optional
 from collections import defaultdict
+from concurrent.futures import ProcessPoolExecutor
 
 DIRECTIONS = [(-1, 0), (0, 1), (1, 0), (0, -1)]
 DIRECTION_NAMES = ["上", "右", "下", "左"]
+CELL_SIZE = 50
+MARGIN = 20
+PIECE_RADIUS = 18
+LINE_WIDTH = 4
+MAX_COLORS = 20
+GRID_COLOR = "#DDDDDD"
+BORDER_COLOR = "#AAAAAA"
+PIECE_OUTLINE = "#333333"
+UNKNOWN_COLOR = "#888888"
+
+def generate_colors(n):
+    colors = {}
+    for i in range(1, n+1):
+        hue = (i-1)/n
+        r, g, b = colorsys.hsv_to_rgb(hue, 0.8, 0.9)
+        hex_color = f"#{int(r*255):02x}{int(g*255):02x}{int(b*255):02x}"
+        colors[i] = hex_color
+    return colors
+
+def piece_radius(cell_size: float) -> float:
+    return min(cell_size * 0.4, PIECE_RADIUS)
+
+def path_line_width(cell_size: float) -> int:
+    return max(2, min(LINE_WIDTH, int(cell_size * 0.1)))
 
 def create_board(size: int) -> np.ndarray:
     return np.zeros((size, size), dtype=int)
@@ -57,6 +89,8 @@ def is_edge_free(pos1, pos2, used_edges):
     return get_edge(pos1, pos2) not in used_edges
 
 def get_path_cost(path: List[Tuple[int, int]], with_turning_cost: bool = False) -> int:
+    if isinstance(path, (bytes, bytearray, memoryview)):
+        return chain_cost(path, with_turning_cost)
     if len(path) <= 2:
         return len(path) - 1
     cost = len(path) - 1
@@ -71,6 +105,57 @@ def get_path_cost(path: List[Tuple[int, int]], with_turning_cost: bool = False)
         cost += turns * 2
     return cost
 
+CHAIN_HEADER = struct.Struct("<HHI")
+CHAIN_STEPS = np.array(DIRECTIONS, dtype=np.int64)
+CHAIN_SHIFTS = np.array([0, 2, 4, 6], dtype=np.uint8)
+
+def path_to_chain(path) -> bytes:
+    coords = np.asarray(path, dtype=np.int64).reshape(-1, 2)
+    if not len(coords):
+        return b""
+    delta = np.diff(coords, axis=0)
+    if np.any(np.abs(delta).sum(axis=1) != 1):
+        raise ValueError("路径不连续，无法编码")
+    codes = np.where(delta[:, 0] != 0, 1 + delta[:, 0], 2 - delta[:, 1]).astype(np.uint8)
+    packed = np.zeros(-(-len(codes) // 4) * 4, dtype=np.uint8)
+    packed[:len(codes)] = codes
+    packed = np.bitwise_or.reduce(packed.reshape(-1, 4) << CHAIN_SHIFTS, axis=1).astype(np.uint8)
+    return CHAIN_HEADER.pack(int(coords[0, 0]), int(coords[0, 1]), len(codes)) + packed.tobytes()
+
+def chain_codes(chain) -> np.ndarray:
+    _, _, steps = CHAIN_HEADER.unpack_from(chain)
+    packed = np.frombuffer(chain, dtype=np.uint8, offset=CHAIN_HEADER.size)
+    return ((packed[:, None] >> CHAIN_SHIFTS) & 3).ravel()[:steps]
+
+def chain_to_array(chain) -> np.ndarray:
+    if not len(chain):
+        return np.empty((0, 2), dtype=np.int64)
+    x, y, _ = CHAIN_HEADER.unpack_from(chain)
+    codes = chain_codes(chain)
+    coords = np.empty((len(codes) + 1, 2), dtype=np.int64)
+    coords[0] = (x, y)
+    np.cumsum(CHAIN_STEPS[codes], axis=0, out=coords[1:])
+    coords[1:] += coords[0]
+    return coords
+
+def chain_to_path(chain) -> List[Tuple[int, int]]:
+    return [(x, y) for x, y in chain_to_array(chain).tolist()]
+
+def chain_cost(chain, with_turning_cost: bool = False) -> int:
+    if not len(chain):
+        return -1
+    codes = chain_codes(chain)
+    cost = len(codes)
+    if with_turning_cost:
+        cost += 2 * int(np.count_nonzero(codes[1:] != codes[:-1]))
+    return cost
+
+def encode_paths(paths: Dict[int, List[Tuple[int, int]]]) -> Dict[int, bytes]:
+    return {color: path_to_chain(path) for color, path in paths.items()}
+
+def decode_paths(chains: Dict[int, bytes]) -> Dict[int, List[Tuple[int, int]]]:
+    return {color: chain_to_path(chain) for color, chain in chains.items()}
+
 def encode_state(x: int, y: int, dir_idx: int) -> str:
     return f"{x},{y},{dir_idx}"
 
@@ -81,7 +166,48 @@ def decode_state(code: str) -> Tuple[int, int, int]:
         return (x, y, dir_idx)
     return (-1, -1, -1)
 
-def bidirectional_astar_search(board: np.ndarray, start: Tuple[int, int], end: Tuple[int, int], occupied_cells: Set[Tuple[int, int]], with_turning_cost: bool = False, color: int = 0, verbose: bool = True, used_edges: Set[Tuple[Tuple[int, int], Tuple[int, int]]] = None) -> List[Tuple[int, int]]:
+def new_search_stats(size: int) -> Dict:
+    return {
+        "forward_expansions": np.zeros((size, size), dtype=np.int64),
+        "backward_expansions": np.zeros((size, size), dtype=np.int64),
+        "meeting_points": {},
+        "iterations": {},
+        "bounds": {},
+    }
+
+class SearchWorkspace:
+    def __init__(self, size: int):
+        self.size = size
+        state_count = size * size * 5
+        self.generation = 0
+        self.f_g = array('d', [0.0]) * state_count
+        self.b_g = array('d', [0.0]) * state_count
+        self.f_parent = array('q', [-1]) * state_count
+        self.b_parent = array('q', [-1]) * state_count
+        self.f_stamp = array('L', [0]) * state_count
+        self.b_stamp = array('L', [0]) * state_count
+        self.f_closed = array('L', [0]) * state_count
+        self.b_closed = array('L', [0]) * state_count
+        self.f_open = array('L', [0]) * state_count
+        self.b_open = array('L', [0]) * state_count
+        self.f_heap = []
+        self.b_heap = []
+        self.f_lb_heap = []
+        self.b_lb_heap = []
+
+    def reset(self) -> int:
+        self.f_heap.clear()
+        self.b_heap.clear()
+        self.f_lb_heap.clear()
+        self.b_lb_heap.clear()
+        self.generation += 1
+        if self.generation >= 0xFFFFFFFF:
+            for buffer in (self.f_stamp, self.b_stamp, self.f_closed, self.b_closed, self.f_open, self.b_open):
+                buffer[:] = array('L', [0]) * len(buffer)
+            self.generation = 1
+        return self.generation
+
+def bidirectional_astar_search(board: np.ndarray, start: Tuple[int, int], end: Tuple[int, int], occupied_cells: Set[Tuple[int, int]], with_turning_cost: bool = False, color: int = 0, verbose: bool = True, used_edges: Set[Tuple[Tuple[int, int], Tuple[int, int]]] = None, trace=None, stats: Optional[Dict] = None, cancel_event=None, workspace: Optional[SearchWorkspace] = None, epsilon: Optional[float] = None) -> List[Tuple[int, int]]:
     if used_edges is None:
         used_edges = set()
     start_time = time.time()
@@ -95,7 +221,11 @@ def bidirectional_astar_search(board: np.ndarray, start: Tuple[int, int], end: T
     if start == end:
         return [start]
     distance = abs(start[0] - end[0]) + abs(start[1] - end[1])
-    if size <= 8:
+    exact = epsilon is not None
+    if exact and epsilon < 0:
+        raise ValueError("epsilon不能为负数")
+    weight = 1.0 + epsilon if exact else 1.0
+    if size <= 8 or exact:
         min_x, max_x = 0, size - 1
         min_y, max_y = 0, size - 1
     else:
@@ -104,165 +234,259 @@ def bidirectional_astar_search(board: np.ndarray, start: Tuple[int, int], end: T
         max_x = min(size - 1, max(start[0], end[0]) + margin)
         min_y = max(0, min(start[1], end[1]) - margin)
         max_y = min(size - 1, max(start[1], end[1]) + margin)
-    if distance < 10:
+    if exact:
+        max_iterations = size * size * 10
+        timeout = 10.0
+    elif distance < 10:
         max_iterations = size * size * 2
         timeout = 5.0
     else:
         max_iterations = size * size * 3
         timeout = 10.0
-    h_cache = {}
-    def h(pos, target, dir_idx=-1):
-        cache_key = (pos, target, dir_idx)
-        if cache_key in h_cache:
-            return h_cache[cache_key]
-        basic_dist = abs(pos[0] - target[0]) + abs(pos[1] - target[1])
-        turn_estimate = 0
+    if workspace is None or workspace.size != size:
+        workspace = SearchWorkspace(size)
+    generation = workspace.reset()
+    f_g_scores = workspace.f_g
+    f_parents = workspace.f_parent
+    f_stamp = workspace.f_stamp
+    f_closed = workspace.f_closed
+    f_in_open = workspace.f_open
+    f_open_set = workspace.f_heap
+    b_g_scores = workspace.b_g
+    b_parents = workspace.b_parent
+    b_stamp = workspace.b_stamp
+    b_closed = workspace.b_closed
+    b_in_open = workspace.b_open
+    b_open_set = workspace.b_heap
+    f_lb_heap = f_open_set if weight == 1.0 else workspace.f_lb_heap
+    b_lb_heap = b_open_set if weight == 1.0 else workspace.b_lb_heap
+    def h(x, y, target, dir_idx):
+        basic_dist = abs(x - target[0]) + abs(y - target[1])
         if with_turning_cost and dir_idx >= 0:
-            if target[0] < pos[0]: ideal_dir = 0
-            elif target[0] > pos[0]: ideal_dir = 2
-            elif target[1] > pos[1]: ideal_dir = 1
-            elif target[1] < pos[1]: ideal_dir = 3
+            if target[0] < x: ideal_dir = 0
+            elif target[0] > x: ideal_dir = 2
+            elif target[1] > y: ideal_dir = 1
+            elif target[1] < y: ideal_dir = 3
             else: ideal_dir = -1
             if ideal_dir != -1 and dir_idx != ideal_dir:
-                turn_estimate = 2
-        h_value = basic_dist + turn_estimate
-        h_cache[cache_key] = h_value
-        return h_value
-    f_open_set = []
-    f_closed_set = set()
-    f_g_scores = {}
-    f_parents = {}
-    f_in_open = set()
-    b_open_set = []
-    b_closed_set = set()
-    b_g_scores = {}
-    b_parents = {}
-    b_in_open = set()
+                return basic_dist + 2
+        return basic_dist
+    f_closed_count = 0
+    b_closed_count = 0
     iterations = 0
     last_progress_time = time.time()
     f_counter = 0
     b_counter = 0
     if verbose:
         print(f"正在为颜色 {color} 寻找路径: {start} → {end} {'(含转向代价)' if with_turning_cost else ''}")
-    f_start_state = encode_state(start[0], start[1], -1)
+    if trace is not None:
+        trace.begin(size, start, end, color)
+    if stats is not None:
+        if not stats or stats["forward_expansions"].shape != (size, size):
+            stats.update(new_search_stats(size))
+        f_expansions = stats["forward_expansions"]
+        b_expansions = stats["backward_expansions"]
+    f_start_state = (start[0] * size + start[1]) * 5
     f_g_scores[f_start_state] = 0
-    f_score = h(start, end, -1)
-    heapq.heappush(f_open_set, (f_score, f_counter, f_start_state))
+    f_parents[f_start_state] = -1
+    f_stamp[f_start_state] = generation
+    heapq.heappush(f_open_set, (h(start[0], start[1], end, -1), f_counter, f_start_state))
     f_counter += 1
-    f_in_open.add(f_start_state)
-    b_start_state = encode_state(end[0], end[1], -1)
+    f_in_open[f_start_state] = generation
+    b_start_state = (end[0] * size + end[1]) * 5
     b_g_scores[b_start_state] = 0
-    b_score = h(end, start, -1)
-    heapq.heappush(b_open_set, (b_score, b_counter, b_start_state))
+    b_parents[b_start_state] = -1
+    b_stamp[b_start_state] = generation
+    heapq.heappush(b_open_set, (h(end[0], end[1], start, -1), b_counter, b_start_state))
     b_counter += 1
-    b_in_open.add(b_start_state)
+    b_in_open[b_start_state] = generation
+    if f_lb_heap is not f_open_set:
+        heapq.heappush(f_lb_heap, (h(start[0], start[1], end, -1), 0, f_start_state))
+        heapq.heappush(b_lb_heap, (h(end[0], end[1], start, -1), 0, b_start_state))
+    check_edges = bool(used_edges)
+    unbounded = color == 2 or exact
+    noisy = color == 2 and not exact
     best_path_cost = float('inf')
     best_path_meeting_point = None
     best_f_state = None
     best_b_state = None
     while f_open_set and b_open_set:
         iterations += 1
+        if cancel_event is not None and cancel_event.is_set():
+            break
         if iterations > max_iterations or time.time() - start_time > timeout:
             if verbose:
                 print(f"颜色 {color} 搜索迭代次数过多({iterations})或超时，停止搜索")
             break
         if verbose and iterations % 1000 == 0 and time.time() - last_progress_time > 1.0:
             elapsed = time.time() - start_time
-            print(f"颜色 {color} 搜索进度: 迭代={iterations}, 前向={len(f_closed_set)}, 后向={len(b_closed_set)}, 用时={elapsed:.1f}秒")
+            print(f"颜色 {color} 搜索进度: 迭代={iterations}, 前向={f_closed_count}, 后向={b_closed_count}, 用时={elapsed:.1f}秒")
             last_progress_time = time.time()
         if f_open_set:
-            try:
-                _, _, f_current_state = heapq.heappop(f_open_set)
-                f_in_open.discard(f_current_state)
-                if f_current_state in f_closed_set:
-                    continue
-                f_x, f_y, f_dir_idx = decode_state(f_current_state)
-                f_current = (f_x, f_y)
-                if not is_valid_position(f_current, size):
-                    continue
-                f_closed_set.add(f_current_state)
-                for b_dir in range(-1, 4):
-                    b_state = encode_state(f_x, f_y, b_dir)
-                    if b_state in b_closed_set or b_state in b_in_open:
-                        path_cost = f_g_scores[f_current_state] + b_g_scores.get(b_state, float('inf'))
-                        if path_cost < best_path_cost:
-                            best_path_cost = path_cost
-                            best_path_meeting_point = (f_x, f_y)
-                            best_f_state = f_current_state
-                            best_b_state = b_state
-                if f_g_scores[f_current_state] > best_path_cost:
-                    continue
-                for i, (dx, dy) in enumerate(DIRECTIONS):
-                    nx, ny = f_x + dx, f_y + dy
-                    neighbor = (nx, ny)
-                    if color == 2 or (min_x <= nx <= max_x and min_y <= ny <= max_y):
-                        if is_valid_position(neighbor, size):
-                            if neighbor == end or neighbor not in occupied_cells:
-                                if get_edge(f_current, neighbor) not in used_edges:
-                                    turn_cost = 0
-                                    if with_turning_cost and f_dir_idx != -1 and f_dir_idx != i:
-                                        turn_cost = 2
-                                    neighbor_state = encode_state(nx, ny, i)
-                                    tentative_g = f_g_scores[f_current_state] + 1 + turn_cost
-                                    if neighbor_state not in f_g_scores or tentative_g < f_g_scores[neighbor_state]:
-                                        f_parents[neighbor_state] = f_current_state
-                                        f_g_scores[neighbor_state] = tentative_g
-                                        random_factor = np.random.random() * 0.2 if color == 2 else 0
-                                        f_score = tentative_g + h(neighbor, end, i) + random_factor
-                                        if neighbor_state not in f_in_open:
-                                            heapq.heappush(f_open_set, (f_score, f_counter, neighbor_state))
-                                            f_counter += 1
-                                            f_in_open.add(neighbor_state)
-            except Exception:
+            _, _, f_current_state = heapq.heappop(f_open_set)
+            f_in_open[f_current_state] = 0
+            if f_closed[f_current_state] == generation:
+                continue
+            f_cell, f_dir_slot = divmod(f_current_state, 5)
+            f_x, f_y = divmod(f_cell, size)
+            f_dir_idx = f_dir_slot - 1
+            f_current = (f_x, f_y)
+            f_closed[f_current_state] = generation
+            f_closed_count += 1
+            f_g = f_g_scores[f_current_state]
+            if trace is not None:
+                trace.pop(0, f_x, f_y, f_dir_idx, iterations, f_g)
+            if stats is not None:
+                f_expansions[f_x, f_y] += 1
+            base = f_cell * 5
+            for b_dir in range(-1, 4):
+                b_state = base + b_dir + 1
+                if b_closed[b_state] == generation or b_in_open[b_state] == generation:
+                    path_cost = f_g + b_g_scores[b_state]
+                    if exact and with_turning_cost and f_dir_idx != -1 and b_dir != -1 and f_dir_idx != (b_dir + 2) % 4:
+                        path_cost += 2
+                    if path_cost < best_path_cost:
+                        best_path_cost = path_cost
+                        best_path_meeting_point = f_current
+                        best_f_state = f_current_state
+                        best_b_state = b_state
+                        if trace is not None:
+                            trace.meet(0, f_x, f_y, b_dir, iterations, path_cost)
+            if f_g > best_path_cost or (exact and f_g + h(f_x, f_y, end, f_dir_idx) >= best_path_cost):
                 continue
+            for i, (dx, dy) in enumerate(DIRECTIONS):
+                nx, ny = f_x + dx, f_y + dy
+                if unbounded or (min_x <= nx <= max_x and min_y <= ny <= max_y):
+                    if 0 <= nx < size and 0 <= ny < size:
+                        neighbor = (nx, ny)
+                        if neighbor == end or neighbor not in occupied_cells:
+                            if not check_edges or get_edge(f_current, neighbor) not in used_edges:
+                                turn_cost = 0
+                                if with_turning_cost and f_dir_idx != -1 and f_dir_idx != i:
+                                    turn_cost = 2
+                                neighbor_state = (nx * size + ny) * 5 + i + 1
+                                tentative_g = f_g + 1 + turn_cost
+                                if f_stamp[neighbor_state] != generation or tentative_g < f_g_scores[neighbor_state]:
+                                    f_stamp[neighbor_state] = generation
+                                    f_parents[neighbor_state] = f_current_state
+                                    f_g_scores[neighbor_state] = tentative_g
+                                    if exact:
+                                        h_value = h(nx, ny, end, i)
+                                        f_closed[neighbor_state] = 0
+                                        heapq.heappush(f_open_set, (tentative_g + weight * h_value, f_counter, neighbor_state))
+                                        if f_lb_heap is not f_open_set:
+                                            heapq.heappush(f_lb_heap, (tentative_g + h_value, f_counter, neighbor_state))
+                                        f_counter += 1
+                                        f_in_open[neighbor_state] = generation
+                                        if trace is not None:
+                                            trace.push(0, nx, ny, i, iterations, tentative_g)
+                                        continue
+                                    random_factor = np.random.random() * 0.2 if noisy else 0
+                                    f_score = tentative_g + h(nx, ny, end, i) + random_factor
+                                    if f_in_open[neighbor_state] != generation:
+                                        heapq.heappush(f_open_set, (f_score, f_counter, neighbor_state))
+                                        f_counter += 1
+                                        f_in_open[neighbor_state] = generation
+                                        if trace is not None:
+                                            trace.push(0, nx, ny, i, iterations, tentative_g)
         if b_open_set:
-            try:
-                _, _, b_current_state = heapq.heappop(b_open_set)
-                b_in_open.discard(b_current_state)
-                if b_current_state in b_closed_set:
-                    continue
-                b_x, b_y, b_dir_idx = decode_state(b_current_state)
-                b_current = (b_x, b_y)
-                if not is_valid_position(b_current, size):
-                    continue
-                b_closed_set.add(b_current_state)
-                for f_dir in range(-1, 4):
-                    f_state = encode_state(b_x, b_y, f_dir)
-                    if f_state in f_closed_set or f_state in f_in_open:
-                        path_cost = b_g_scores[b_current_state] + f_g_scores.get(f_state, float('inf'))
-                        if path_cost < best_path_cost:
-                            best_path_cost = path_cost
-                            best_path_meeting_point = (b_x, b_y)
-                            best_f_state = f_state
-                            best_b_state = b_current_state
-                if b_g_scores[b_current_state] > best_path_cost:
-                    continue
-                for i, (dx, dy) in enumerate(DIRECTIONS):
-                    nx, ny = b_x + dx, b_y + dy
-                    neighbor = (nx, ny)
-                    if color == 2 or (min_x <= nx <= max_x and min_y <= ny <= max_y):
-                        if is_valid_position(neighbor, size):
-                            if neighbor == start or neighbor not in occupied_cells:
-                                if get_edge(b_current, neighbor) not in used_edges:
-                                    turn_cost = 0
-                                    if with_turning_cost and b_dir_idx != -1 and b_dir_idx != i:
-                                        turn_cost = 2
-                                    neighbor_state = encode_state(nx, ny, i)
-                                    tentative_g = b_g_scores[b_current_state] + 1 + turn_cost
-                                    if neighbor_state not in b_g_scores or tentative_g < b_g_scores[neighbor_state]:
-                                        b_parents[neighbor_state] = b_current_state
-                                        b_g_scores[neighbor_state] = tentative_g
-                                        random_factor = np.random.random() * 0.2 if color == 2 else 0
-                                        b_score = tentative_g + h(neighbor, start, i) + random_factor
-                                        if neighbor_state not in b_in_open:
-                                            heapq.heappush(b_open_set, (b_score, b_counter, neighbor_state))
-                                            b_counter += 1
-                                            b_in_open.add(neighbor_state)
-            except Exception:
+            _, _, b_current_state = heapq.heappop(b_open_set)
+            b_in_open[b_current_state] = 0
+            if b_closed[b_current_state] == generation:
+                continue
+            b_cell, b_dir_slot = divmod(b_current_state, 5)
+            b_x, b_y = divmod(b_cell, size)
+            b_dir_idx = b_dir_slot - 1
+            b_current = (b_x, b_y)
+            b_closed[b_current_state] = generation
+            b_closed_count += 1
+            b_g = b_g_scores[b_current_state]
+            if trace is not None:
+                trace.pop(1, b_x, b_y, b_dir_idx, iterations, b_g)
+            if stats is not None:
+                b_expansions[b_x, b_y] += 1
+            base = b_cell * 5
+            for f_dir in range(-1, 4):
+                f_state = base + f_dir + 1
+                if f_closed[f_state] == generation or f_in_open[f_state] == generation:
+                    path_cost = b_g + f_g_scores[f_state]
+                    if exact and with_turning_cost and b_dir_idx != -1 and f_dir != -1 and f_dir != (b_dir_idx + 2) % 4:
+                        path_cost += 2
+                    if path_cost < best_path_cost:
+                        best_path_cost = path_cost
+                        best_path_meeting_point = b_current
+                        best_f_state = f_state
+                        best_b_state = b_current_state
+                        if trace is not None:
+                            trace.meet(1, b_x, b_y, f_dir, iterations, path_cost)
+            if b_g > best_path_cost or (exact and b_g + h(b_x, b_y, start, b_dir_idx) >= best_path_cost):
                 continue
-        if best_path_meeting_point is not None and iterations % 100 == 0:
+            for i, (dx, dy) in enumerate(DIRECTIONS):
+                nx, ny = b_x + dx, b_y + dy
+                if unbounded or (min_x <= nx <= max_x and min_y <= ny <= max_y):
+                    if 0 <= nx < size and 0 <= ny < size:
+                        neighbor = (nx, ny)
+                        if neighbor == start or neighbor not in occupied_cells:
+                            if not check_edges or get_edge(b_current, neighbor) not in used_edges:
+                                turn_cost = 0
+                                if with_turning_cost and b_dir_idx != -1 and b_dir_idx != i:
+                                    turn_cost = 2
+                                neighbor_state = (nx * size + ny) * 5 + i + 1
+                                tentative_g = b_g + 1 + turn_cost
+                                if b_stamp[neighbor_state] != generation or tentative_g < b_g_scores[neighbor_state]:
+                                    b_stamp[neighbor_state] = generation
+                                    b_parents[neighbor_state] = b_current_state
+                                    b_g_scores[neighbor_state] = tentative_g
+                                    if exact:
+                                        h_value = h(nx, ny, start, i)
+                                        b_closed[neighbor_state] = 0
+                                        heapq.heappush(b_open_set, (tentative_g + weight * h_value, b_counter, neighbor_state))
+                                        if b_lb_heap is not b_open_set:
+                                            heapq.heappush(b_lb_heap, (tentative_g + h_value, b_counter, neighbor_state))
+                                        b_counter += 1
+                                        b_in_open[neighbor_state] = generation
+                                        if trace is not None:
+                                            trace.push(1, nx, ny, i, iterations, tentative_g)
+                                        continue
+                                    random_factor = np.random.random() * 0.2 if noisy else 0
+                                    b_score = tentative_g + h(nx, ny, start, i) + random_factor
+                                    if b_in_open[neighbor_state] != generation:
+                                        heapq.heappush(b_open_set, (b_score, b_counter, neighbor_state))
+                                        b_counter += 1
+                                        b_in_open[neighbor_state] = generation
+                                        if trace is not None:
+                                            trace.push(1, nx, ny, i, iterations, tentative_g)
+        if exact:
+            if best_path_meeting_point is not None:
+                while f_lb_heap and f_closed[f_lb_heap[0][2]] == generation:
+                    heapq.heappop(f_lb_heap)
+                while b_lb_heap and b_closed[b_lb_heap[0][2]] == generation:
+                    heapq.heappop(b_lb_heap)
+                if not f_lb_heap or not b_lb_heap or best_path_cost <= weight * max(f_lb_heap[0][0], b_lb_heap[0][0]):
+                    break
+        elif best_path_meeting_point is not None and iterations % 100 == 0:
             if (f_open_set and b_open_set and f_open_set[0][0] + b_open_set[0][0] > best_path_cost * 1.1):
                 break
+    achieved_bound = None
+    if exact and best_path_meeting_point is not None:
+        while f_lb_heap and f_closed[f_lb_heap[0][2]] == generation:
+            heapq.heappop(f_lb_heap)
+        while b_lb_heap and b_closed[b_lb_heap[0][2]] == generation:
+            heapq.heappop(b_lb_heap)
+        if not f_lb_heap or not b_lb_heap:
+            achieved_bound = 1.0
+        else:
+            lower_bound = max(f_lb_heap[0][0], b_lb_heap[0][0])
+            achieved_bound = max(1.0, best_path_cost / lower_bound) if lower_bound > 0 else float('inf')
+    if stats is not None:
+        stats["meeting_points"][color] = best_path_meeting_point
+        stats["iterations"][color] = iterations
+        if achieved_bound is not None:
+            stats.setdefault("bounds", {})[color] = achieved_bound
+    if cancel_event is not None and cancel_event.is_set():
+        if verbose:
+            print(f"颜色 {color} 的搜索已取消")
+        return []
     if best_path_meeting_point is None:
         if abs(start[0] - end[0]) + abs(start[1] - end[1]) == 1:
             return [start, end]
@@ -272,40 +496,24 @@ def bidirectional_astar_search(board: np.ndarray, start: Tuple[int, int], end: T
         return []
     try:
         forward_path = []
-        if best_f_state is not None:
-            state = best_f_state
-            visited_states = set()
-            while state in f_parents and state not in visited_states:
-                visited_states.add(state)
-                x, y, _ = decode_state(state)
-                if is_valid_position((x, y), size):
-                    forward_path.append((x, y))
-                state = f_parents[state]
-            if state not in visited_states:
-                x, y, _ = decode_state(state)
-                if is_valid_position((x, y), size):
-                    forward_path.append((x, y))
+        state = best_f_state
+        while state != -1:
+            forward_path.append(divmod(state // 5, size))
+            state = f_parents[state]
         forward_path.reverse()
         if not forward_path:
             forward_path = [start]
         elif forward_path[0] != start:
             forward_path[0] = start
-        if best_path_meeting_point is not None and (not forward_path or forward_path[-1] != best_path_meeting_point):
+        if forward_path[-1] != best_path_meeting_point:
             forward_path.append(best_path_meeting_point)
         backward_path = []
-        if best_b_state is not None:
-            state = best_b_state
-            visited_states = set()
-            while state in b_parents and state not in visited_states:
-                visited_states.add(state)
-                x, y, _ = decode_state(state)
-                if (x, y) != best_path_meeting_point and is_valid_position((x, y), size):
-                    backward_path.append((x, y))
-                state = b_parents[state]
-            if state not in visited_states:
-                x, y, _ = decode_state(state)
-                if (x, y) != best_path_meeting_point and is_valid_position((x, y), size):
-                    backward_path.append((x, y))
+        state = best_b_state
+        while state != -1:
+            cell = divmod(state // 5, size)
+            if cell != best_path_meeting_point:
+                backward_path.append(cell)
+            state = b_parents[state]
         if not backward_path:
             if end != best_path_meeting_point:
                 backward_path = [end]
@@ -338,7 +546,8 @@ def bidirectional_astar_search(board: np.ndarray, start: Tuple[int, int], end: T
                 valid_path.append(curr)
         elapsed = time.time() - start_time
         if verbose:
-            print(f"颜色 {color} 路径找到! 长度={len(valid_path)}, 迭代={iterations}, 用时={elapsed:.1f}秒")
+            bound_text = f", 代价界={achieved_bound:.3f}" if achieved_bound is not None else ""
+            print(f"颜色 {color} 路径找到! 长度={len(valid_path)}, 迭代={iterations}, 用时={elapsed:.1f}秒{bound_text}")
             print(f"路径: {valid_path}")
         return valid_path
     except Exception:
@@ -349,20 +558,161 @@ def bidirectional_astar_search(board: np.ndarray, start: Tuple[int, int], end: T
             return simple_path
         return [start, end]
 
-def solve_crossline(board: np.ndarray, pairs: Dict[int, List[Tuple[int, int]]], with_turning_cost: bool = False, verbose: bool = True) -> Dict[int, List[Tuple[int, int]]]:
+def min_turns_to_target(x: int, y: int, dir_idx: int, target: Tuple[int, int]) -> int:
+    dx = target[0] - x
+    dy = target[1] - y
+    if dx == 0 and dy == 0:
+        return 0
+    step_x, step_y = DIRECTIONS[dir_idx]
+    toward = step_x * dx + step_y * dy
+    if dx == 0 or dy == 0:
+        if toward > 0:
+            return 0
+        return 1 if toward == 0 else 3
+    return 1 if toward > 0 else 2
+
+def turn_aware_search(board: np.ndarray, start: Tuple[int, int], end: Tuple[int, int], occupied_cells: Set[Tuple[int, int]], with_turning_cost: bool = True, color: int = 0, verbose: bool = True, trace=None, stats: Optional[Dict] = None, cancel_event=None, workspace: Optional[SearchWorkspace] = None) -> List[Tuple[int, int]]:
+    start_time = time.time()
+    size = board.shape[0]
+    if not is_valid_position(start, size) or not is_valid_position(end, size):
+        if verbose:
+            print(f"颜色 {color} 的起点或终点无效: {start} -> {end}")
+        return []
+    if start == end:
+        return [start]
+    if abs(start[0] - end[0]) + abs(start[1] - end[1]) == 1:
+        return [start, end]
+    turn_penalty = 2 if with_turning_cost else 0
+    if workspace is None or workspace.size != size:
+        workspace = SearchWorkspace(size)
+    generation = workspace.reset()
+    g_scores = (workspace.f_g, workspace.b_g)
+    parents = (workspace.f_parent, workspace.b_parent)
+    stamps = (workspace.f_stamp, workspace.b_stamp)
+    closed = (workspace.f_closed, workspace.b_closed)
+    heaps = (workspace.f_heap, workspace.b_heap)
+    targets = (end, start)
+    blocked = bytearray(size * size)
+    for x, y in occupied_cells:
+        if 0 <= x < size and 0 <= y < size:
+            blocked[x * size + y] = 1
+    blocked[start[0] * size + start[1]] = 1
+    blocked[end[0] * size + end[1]] = 1
+    def h(side, x, y, dir_idx):
+        target = targets[side]
+        if side == 1:
+            dir_idx = (dir_idx + 2) % 4
+        return abs(x - target[0]) + abs(y - target[1]) + turn_penalty * min_turns_to_target(x, y, dir_idx, target)
+    if verbose:
+        print(f"正在为颜色 {color} 寻找最小转向代价路径: {start} → {end} {'(含转向代价)' if with_turning_cost else ''}")
+    if trace is not None:
+        trace.begin(size, start, end, color)
+    if stats is not None:
+        if not stats or stats["forward_expansions"].shape != (size, size):
+            stats.update(new_search_stats(size))
+        expansions = (stats["forward_expansions"], stats["backward_expansions"])
+    for side, (origin_x, origin_y) in ((0, start), (1, end)):
+        if trace is not None:
+            trace.pop(side, origin_x, origin_y, -1, 0, 0)
+        for i, (dx, dy) in enumerate(DIRECTIONS):
+            nx, ny = (origin_x + dx, origin_y + dy) if side == 0 else (origin_x - dx, origin_y - dy)
+            if 0 <= nx < size and 0 <= ny < size and not blocked[nx * size + ny]:
+                state = (nx * size + ny) * 5 + i + 1
+                g_scores[side][state] = 1
+                parents[side][state] = -1
+                stamps[side][state] = generation
+                heapq.heappush(heaps[side], (1 + h(side, nx, ny, i), -1, state))
+                if trace is not None:
+                    trace.push(side, nx, ny, i, 0, 1)
+    best_cost = float('inf')
+    best_states = None
+    iterations = 0
+    while heaps[0] and heaps[1]:
+        if cancel_event is not None and cancel_event.is_set():
+            break
+        if best_cost <= max(heaps[0][0][0], heaps[1][0][0]):
+            break
+        side = 0 if len(heaps[0]) <= len(heaps[1]) else 1
+        other = 1 - side
+        f_value, _, state = heapq.heappop(heaps[side])
+        if closed[side][state] == generation:
+            continue
+        closed[side][state] = generation
+        iterations += 1
+        g = g_scores[side][state]
+        cell, dir_slot = divmod(state, 5)
+        x, y = divmod(cell, size)
+        dir_idx = dir_slot - 1
+        reverse_idx = (dir_idx + 2) % 4
+        if trace is not None:
+            trace.pop(side, x, y, dir_idx, iterations, g)
+        if stats is not None:
+            expansions[side][x, y] += 1
+        other_g = g_scores[other]
+        other_stamp = stamps[other]
+        for other_dir in range(4):
+            other_state = cell * 5 + other_dir + 1
+            if other_dir != reverse_idx and other_stamp[other_state] == generation:
+                path_cost = g + other_g[other_state] + (turn_penalty if other_dir != dir_idx else 0)
+                if path_cost < best_cost:
+                    best_cost = path_cost
+                    best_states = (state, other_state) if side == 0 else (other_state, state)
+                    if trace is not None:
+                        trace.meet(side, x, y, other_dir, iterations, path_cost)
+        if f_value >= best_cost:
+            continue
+        g_side = g_scores[side]
+        stamp_side = stamps[side]
+        for i, (dx, dy) in enumerate(DIRECTIONS):
+            if i == reverse_idx:
+                continue
+            nx, ny = (x + dx, y + dy) if side == 0 else (x - dx, y - dy)
+            if 0 <= nx < size and 0 <= ny < size and not blocked[nx * size + ny]:
+                neighbor_state = (nx * size + ny) * 5 + i + 1
+                tentative_g = g + 1 + (turn_penalty if i != dir_idx else 0)
+                if stamp_side[neighbor_state] != generation or tentative_g < g_side[neighbor_state]:
+                    stamp_side[neighbor_state] = generation
+                    g_side[neighbor_state] = tentative_g
+                    parents[side][neighbor_state] = state
+                    closed[side][neighbor_state] = 0
+                    heapq.heappush(heaps[side], (tentative_g + h(side, nx, ny, i), -tentative_g, neighbor_state))
+                    if trace is not None:
+                        trace.push(side, nx, ny, i, iterations, tentative_g)
+    if stats is not None:
+        stats["meeting_points"][color] = divmod(best_states[0] // 5, size) if best_states else None
+        stats["iterations"][color] = iterations
+        if best_states:
+            stats.setdefault("bounds", {})[color] = 1.0
+    if cancel_event is not None and cancel_event.is_set():
+        if verbose:
+            print(f"颜色 {color} 的搜索已取消")
+        return []
+    if best_states is None:
+        if verbose:
+            print(f"颜色 {color} 未找到路径! 迭代={iterations}, 用时={time.time() - start_time:.1f}秒")
+        return []
+    forward_path = []
+    state = best_states[0]
+    while state != -1:
+        forward_path.append(divmod(state // 5, size))
+        state = workspace.f_parent[state]
+    backward_path = []
+    state = workspace.b_parent[best_states[1]]
+    while state != -1:
+        backward_path.append(divmod(state // 5, size))
+        state = workspace.b_parent[state]
+    path = [start] + forward_path[::-1] + backward_path + [end]
+    if verbose:
+        print(f"颜色 {color} 路径找到! 长度={len(path)}, 代价={best_cost:g}, 迭代={iterations}, 用时={time.time() - start_time:.1f}秒")
+        print(f"路径: {path}")
+    return path
+
+def order_colors(board: np.ndarray, pairs: Dict[int, List[Tuple[int, int]]], strategy: str = "distance", seed: Optional[int] = None) -> List[int]:
     size = board.shape[0]
     occupied_cells = set()
-    total_start_time = time.time()
-    for color, positions in pairs.items():
+    for positions in pairs.values():
         for pos in positions:
             occupied_cells.add(pos)
-    color_paths = {}
-    used_cells = occupied_cells.copy()
-    used_edges = set()
-    if verbose:
-        print(f"{'=' * 40}")
-        print(f"开始求解 {len(pairs)} 对棋子的连接路径 {'(含转向代价)' if with_turning_cost else ''}")
-        print(f"{'=' * 40}")
     pair_distances = []
     for color, positions in pairs.items():
         if len(positions) == 2:
@@ -381,15 +731,159 @@ def solve_crossline(board: np.ndarray, pairs: Dict[int, List[Tuple[int, int]]],
             pair_distances.append((score, color))
     pair_distances.sort()
     sorted_colors = [color for _, color in pair_distances]
-    for idx, color in enumerate(sorted_colors):
-        if verbose:
+    if strategy == "distance":
+        return sorted_colors
+    if strategy == "reversed":
+        return sorted_colors[::-1]
+    if strategy == "color2_first":
+        rest = sorted(color for color in sorted_colors if color != 2)
+        return ([2] if 2 in sorted_colors else []) + rest
+    if strategy == "random":
+        rng = np.random.RandomState(seed)
+        return [sorted_colors[i] for i in rng.permutation(len(sorted_colors))]
+    raise ValueError(f"未知的排序策略: {strategy}")
+
+DYNAMIC_CANDIDATES = 8
+
+def _distance_field(size: int, blocked: bytearray, start: Tuple[int, int], end: Tuple[int, int]) -> Tuple[int, Set[int]]:
+    source = start[0] * size + start[1]
+    target = end[0] * size + end[1]
+    parents = {source: -1}
+    frontier = [source]
+    while frontier:
+        next_frontier = []
+        for cell in frontier:
+            x, y = divmod(cell, size)
+            for neighbor in (cell - size if x > 0 else -1, cell + 1 if y < size - 1 else -1, cell + size if x < size - 1 else -1, cell - 1 if y > 0 else -1):
+                if neighbor < 0 or neighbor in parents:
+                    continue
+                if neighbor == target:
+                    route = set()
+                    while cell != source:
+                        route.add(cell)
+                        cell = parents[cell]
+                    return len(route) + 1, route
+                if not blocked[neighbor]:
+                    parents[neighbor] = cell
+                    next_frontier.append(neighbor)
+        frontier = next_frontier
+    return -1, set()
+
+def _free_neighbors(size: int, blocked: bytearray, pos: Tuple[int, int]) -> int:
+    count = 0
+    for dx, dy in DIRECTIONS:
+        nx, ny = pos[0] + dx, pos[1] + dy
+        if 0 <= nx < size and 0 <= ny < size and not blocked[nx * size + ny]:
+            count += 1
+    return count
+
+def _constrainedness(color: int, positions: List[Tuple[int, int]], field: Tuple[int, Set[int]], blocked: bytearray, size: int, rank: int) -> Tuple[int, int, int]:
+    distance = field[0]
+    if distance < 0:
+        return (-1, 0, rank)
+    free_space = _free_neighbors(size, blocked, positions[0]) + _free_neighbors(size, blocked, positions[1])
+    return (0 if color == 2 else 1, distance * 2 - free_space, rank)
+
+def _claim_route(size: int, blocked: bytearray, path: List[Tuple[int, int]], pairs: Dict[int, List[Tuple[int, int]]], fields: Dict[int, Tuple[int, Set[int]]], others: List[int]) -> Optional[Dict[int, Tuple[int, Set[int]]]]:
+    route = {x * size + y for x, y in path[1:-1]}
+    for cell in route:
+        blocked[cell] = 1
+    updated = {}
+    for color in others:
+        if fields[color][1] & route:
+            field = _distance_field(size, blocked, *pairs[color])
+            if field[0] < 0:
+                for cell in route:
+                    blocked[cell] = 0
+                return None
+            updated[color] = field
+    return updated
+
+def new_solve_profile() -> Dict:
+    return {"phases": defaultdict(float), "colors": defaultdict(lambda: defaultdict(float))}
+
+def _profile_phase(profile: Dict, phase: str, color: Optional[int], since: float) -> float:
+    now = time.perf_counter()
+    profile["phases"][phase] += now - since
+    if color is not None:
+        profile["colors"][color][phase] += now - since
+    return now
+
+def solve_with_order(board: np.ndarray, pairs: Dict[int, List[Tuple[int, int]]], sorted_colors: List[int], with_turning_cost: bool = False, verbose: bool = True, dynamic: bool = False, trace=None, stats: Optional[Dict] = None, cancel_event=None, workspace: Optional[SearchWorkspace] = None, epsilon: Optional[float] = None, profile: Optional[Dict] = None, engine: str = "astar") -> Dict[int, List[Tuple[int, int]]]:
+    if workspace is None or workspace.size != board.shape[0]:
+        workspace = SearchWorkspace(board.shape[0])
+    occupied_cells = set()
+    for color, positions in pairs.items():
+        for pos in positions:
+            occupied_cells.add(pos)
+    color_paths = {}
+    used_cells = occupied_cells.copy()
+    used_edges = set()
+    def search(color):
+        start, end = pairs[color]
+        if engine == "turn":
+            return turn_aware_search(board, start, end, used_cells - {start, end}, with_turning_cost, color, verbose, trace, stats, cancel_event, workspace)
+        return bidirectional_astar_search(board, start, end, used_cells - {start, end}, with_turning_cost, color, verbose, used_edges, trace, stats, cancel_event, workspace, epsilon)
+    if dynamic:
+        size = board.shape[0]
+        remaining = [color for color in sorted_colors if len(pairs[color]) == 2]
+        rank = {color: i for i, color in enumerate(remaining)}
+        blocked = bytearray(size * size)
+        for x, y in occupied_cells:
+            blocked[x * size + y] = 1
+        fields = {color: _distance_field(size, blocked, *pairs[color]) for color in remaining}
+    for idx in range(len(sorted_colors)):
+        if dynamic:
+            if not remaining:
+                break
+            if profile is not None:
+                phase_start = time.perf_counter()
+            candidates = sorted(remaining, key=lambda c: _constrainedness(c, pairs[c], fields[c], blocked, size, rank[c]))[:DYNAMIC_CANDIDATES]
+            if profile is not None:
+                phase_start = _profile_phase(profile, "order", None, phase_start)
+            color, path = candidates[0], []
+            for candidate in candidates:
+                if cancel_event is not None and cancel_event.is_set():
+                    return {}
+                if verbose:
+                    print(f"\n[{idx+1}/{len(sorted_colors)}] 尝试颜色 {candidate}...")
+                candidate_path = search(candidate)
+                if profile is not None:
+                    phase_start = _profile_phase(profile, "search", candidate, phase_start)
+                if not candidate_path:
+                    color = candidate
+                    break
+                updated = _claim_route(size, blocked, candidate_path, pairs, fields, [c for c in remaining if c != candidate])
+                if profile is not None:
+                    phase_start = _profile_phase(profile, "order", candidate, phase_start)
+                if updated is not None:
+                    fields.update(updated)
+                    color, path = candidate, candidate_path
+                    break
+                if verbose:
+                    print(f"颜色 {candidate} 的路径会阻断其他颜色，改选下一个候选")
+            else:
+                if verbose:
+                    print(f"前 {len(candidates)} 个候选颜色的路径都会阻断其他颜色，求解失败")
+                return {}
+            remaining.remove(color)
+        else:
+            color = sorted_colors[idx]
+        if cancel_event is not None and cancel_event.is_set():
+            return {}
+        if verbose and not dynamic:
             print(f"\n[{idx+1}/{len(sorted_colors)}] 处理颜色 {color}...")
         if len(pairs[color]) != 2:
             print(f"警告: 颜色 {color} 没有正好2个棋子")
             continue
         start, end = pairs[color]
         try:
-            path = bidirectional_astar_search(board, start, end, used_cells - {start, end}, with_turning_cost, color, verbose, used_edges)
+            if not dynamic:
+                if profile is not None:
+                    phase_start = time.perf_counter()
+                path = search(color)
+                if profile is not None:
+                    phase_start = _profile_phase(profile, "search", color, phase_start)
             if not path:
                 if verbose:
                     print(f"无法为颜色 {color} 找到路径，求解失败")
@@ -404,6 +898,8 @@ def solve_crossline(board: np.ndarray, pairs: Dict[int, List[Tuple[int, int]]],
                     if verbose:
                         print(f"颜色 {color} 的路径不连续: {path[i-1]} -> {path[i]}")
                     return {}
+            if profile is not None:
+                phase_start = _profile_phase(profile, "validate", color, phase_start)
             for i in range(len(path) - 1):
                 edge = get_edge(path[i], path[i+1])
                 used_edges.add(edge)
@@ -412,6 +908,8 @@ def solve_crossline(board: np.ndarray, pairs: Dict[int, List[Tuple[int, int]]],
                 if path[i+1] != start and path[i+1] != end:
                     used_cells.add(path[i+1])
             color_paths[color] = path
+            if profile is not None:
+                phase_start = _profile_phase(profile, "commit", color, phase_start)
             if verbose:
                 path_cost = get_path_cost(path, with_turning_cost)
                 path_length = len(path) - 1
@@ -421,10 +919,145 @@ def solve_crossline(board: np.ndarray, pairs: Dict[int, List[Tuple[int, int]]],
                 else:
                     print(f"颜色 {color} 路径完成: 长度={path_cost}")
                 print(f"路径结果: {path}")
+            if profile is not None:
+                _profile_phase(profile, "report", color, phase_start)
         except Exception as e:
             if verbose:
                 print(f"处理颜色 {color} 时发生错误: {str(e)}")
             return {}
+    return color_paths
+
+def _wavefront_layers(free: np.ndarray, starts: List[Tuple[int, int]], ends: List[Tuple[int, int]], cancel_event=None) -> Tuple[List[np.ndarray], List[int]]:
+    bits = [np.uint64(1) << np.uint64(i) for i in range(len(starts))]
+    allowed = np.where(free, ~np.uint64(0), np.uint64(0))
+    frontier = np.zeros(free.shape, dtype=np.uint64)
+    for bit, start, end in zip(bits, starts, ends):
+        allowed[end] |= bit
+        frontier[start] |= bit
+    visited = frontier.copy()
+    layers = [frontier]
+    arrival = [-1] * len(starts)
+    active = np.uint64(0)
+    for bit in bits:
+        active |= bit
+    pending = len(starts)
+    while active and pending:
+        if cancel_event is not None and cancel_event.is_set():
+            break
+        grown = np.zeros_like(frontier)
+        grown[1:, :] |= frontier[:-1, :]
+        grown[:-1, :] |= frontier[1:, :]
+        grown[:, 1:] |= frontier[:, :-1]
+        grown[:, :-1] |= frontier[:, 1:]
+        grown &= allowed & ~visited & active
+        visited |= grown
+        frontier = grown
+        layers.append(grown)
+        alive = np.bitwise_or.reduce(grown, axis=None)
+        for i, (bit, end) in enumerate(zip(bits, ends)):
+            if arrival[i] == -1 and grown[end] & bit:
+                arrival[i] = len(layers) - 1
+                active &= ~bit
+                pending -= 1
+        active &= alive
+    return layers, arrival
+
+def _wavefront_backtrace(layers: List[np.ndarray], bit, arrival: int, start: Tuple[int, int], end: Tuple[int, int]) -> List[Tuple[int, int]]:
+    size = layers[0].shape[0]
+    x, y = end
+    path = [end]
+    heading = None
+    for step in range(arrival - 1, -1, -1):
+        layer = layers[step]
+        moves = [(-1, 0), (0, 1), (1, 0), (0, -1)]
+        if heading is not None:
+            moves.remove(heading)
+            moves.insert(0, heading)
+        for dx, dy in moves:
+            nx, ny = x + dx, y + dy
+            if 0 <= nx < size and 0 <= ny < size and layer[nx, ny] & bit:
+                x, y, heading = nx, ny, (dx, dy)
+                break
+        path.append((x, y))
+    path.reverse()
+    return path
+
+def solve_with_wavefront(board: np.ndarray, pairs: Dict[int, List[Tuple[int, int]]], sorted_colors: List[int], verbose: bool = True, cancel_event=None) -> Dict[int, List[Tuple[int, int]]]:
+    size = board.shape[0]
+    free = np.ones((size, size), dtype=bool)
+    for positions in pairs.values():
+        for x, y in positions:
+            free[x, y] = False
+    color_paths = {}
+    pending = []
+    for color in sorted_colors:
+        if len(pairs[color]) != 2:
+            print(f"警告: 颜色 {color} 没有正好2个棋子")
+            continue
+        start, end = pairs[color]
+        if abs(start[0] - end[0]) + abs(start[1] - end[1]) == 1:
+            color_paths[color] = [start, end]
+        else:
+            pending.append(color)
+    rounds = 0
+    while pending:
+        if cancel_event is not None and cancel_event.is_set():
+            return {}
+        rounds += 1
+        batch = pending[:64]
+        starts = [tuple(pairs[color][0]) for color in batch]
+        ends = [tuple(pairs[color][1]) for color in batch]
+        layers, arrival = _wavefront_layers(free, starts, ends, cancel_event)
+        committed = 0
+        for i, color in enumerate(batch):
+            if arrival[i] == -1:
+                if verbose and (cancel_event is None or not cancel_event.is_set()):
+                    print(f"无法为颜色 {color} 找到路径，求解失败")
+                return {}
+            path = _wavefront_backtrace(layers, np.uint64(1) << np.uint64(i), arrival[i], starts[i], ends[i])
+            inner = path[1:-1]
+            if not all(free[pos] for pos in inner):
+                break
+            for pos in inner:
+                free[pos] = False
+            color_paths[color] = path
+            committed += 1
+            if verbose:
+                print(f"颜色 {color} 路径完成: 长度={len(path) - 1}")
+        pending = pending[committed:]
+    if verbose:
+        print(f"波前布线完成: {rounds} 轮, {len(color_paths)} 种颜色")
+    return {color: color_paths[color] for color in sorted_colors if color in color_paths}
+
+def solve_crossline(board: np.ndarray, pairs: Dict[int, List[Tuple[int, int]]], with_turning_cost: bool = False, verbose: bool = True, order_mode: str = "static", trace=None, stats: Optional[Dict] = None, cancel_event=None, workspace: Optional[SearchWorkspace] = None, epsilon: Optional[float] = None, engine: str = "astar", profile: Optional[Dict] = None) -> Dict[int, List[Tuple[int, int]]]:
+    total_start_time = time.time()
+    if verbose:
+        print(f"{'=' * 40}")
+        print(f"开始求解 {len(pairs)} 对棋子的连接路径 {'(含转向代价)' if with_turning_cost else ''}")
+        print(f"{'=' * 40}")
+    if order_mode not in ("static", "dynamic"):
+        raise ValueError(f"未知的排序模式: {order_mode}")
+    if engine not in ("astar", "lee", "turn"):
+        raise ValueError(f"未知的搜索引擎: {engine}")
+    if epsilon is not None and engine != "astar":
+        raise ValueError(f"epsilon仅适用于astar引擎，{engine}引擎不支持")
+    if profile is not None:
+        phase_start = time.perf_counter()
+    sorted_colors = order_colors(board, pairs)
+    if profile is not None:
+        phase_start = _profile_phase(profile, "order", None, phase_start)
+    if engine == "lee" and not with_turning_cost and order_mode == "static":
+        color_paths = solve_with_wavefront(board, pairs, sorted_colors, verbose, cancel_event)
+        if profile is not None:
+            _profile_phase(profile, "search", None, phase_start)
+    else:
+        if engine == "lee" and verbose:
+            print("波前引擎仅支持不含转向代价的静态排序，改用A*搜索")
+        color_paths = solve_with_order(board, pairs, sorted_colors, with_turning_cost, verbose, order_mode == "dynamic", trace, stats, cancel_event, workspace, epsilon, profile, engine)
+    if not color_paths:
+        return {}
+    if profile is not None:
+        phase_start = time.perf_counter()
     if verbose:
         total_time = time.time() - total_start_time
         total_cells = 0
@@ -437,6 +1070,257 @@ def solve_crossline(board: np.ndarray, pairs: Dict[int, List[Tuple[int, int]]],
         print(f"求解完成! 总时间: {total_time:.2f}秒")
         print(f"总共连接了 {len(color_paths)} 对棋子，使用了 {total_cells} 个空格")
         print(f"{'=' * 40}")
+    if profile is not None:
+        _profile_phase(profile, "report", None, phase_start)
+    return color_paths
+
+DEFAULT_PORTFOLIO = ["distance", "dynamic", "reversed", "color2_first", "random:1", "random:2", "random:3", "permutations"]
+WORKER_POLL_INTERVAL = 0.1
+
+def run_strategy(board: np.ndarray, pairs: Dict[int, List[Tuple[int, int]]], strategy: str, with_turning_cost: bool = False, verbose: bool = False, cancel_event=None) -> Dict[int, List[Tuple[int, int]]]:
+    name, _, arg = strategy.partition(":")
+    if name == "permutations":
+        colors = order_colors(board, pairs)
+        limit = int(arg) if arg else 8
+        if len(colors) > limit:
+            return {}
+        workspace = SearchWorkspace(board.shape[0])
+        for perm in itertools.permutations(colors):
+            if cancel_event is not None and cancel_event.is_set():
+                return {}
+            paths = solve_with_order(board, pairs, list(perm), with_turning_cost, verbose, cancel_event=cancel_event, workspace=workspace)
+            if paths:
+                return paths
+        return {}
+    if name == "random":
+        seed = int(arg) if arg else None
+        if seed is not None:
+            np.random.seed(seed)
+        return solve_with_order(board, pairs, order_colors(board, pairs, "random", seed), with_turning_cost, verbose, cancel_event=cancel_event)
+    if name == "dynamic":
+        return solve_with_order(board, pairs, order_colors(board, pairs), with_turning_cost, verbose, True, cancel_event=cancel_event)
+    return solve_with_order(board, pairs, order_colors(board, pairs, name), with_turning_cost, verbose, cancel_event=cancel_event)
+
+def _portfolio_worker(index, strategy, board, pairs, with_turning_cost, result_queue):
+    start_time = time.time()
+    try:
+        paths = run_strategy(board, pairs, strategy, with_turning_cost, False)
+    except Exception:
+        paths = {}
+    result_queue.put((index, encode_paths(paths), time.time() - start_time))
+
+def solve_portfolio(board: np.ndarray, pairs: Dict[int, List[Tuple[int, int]]], with_turning_cost: bool = False, strategies: Optional[List[str]] = None, deadline: Optional[float] = None, wait_for_best: bool = False, max_workers: Optional[int] = None, verbose: bool = False) -> Tuple[Dict[int, List[Tuple[int, int]]], Optional[str]]:
+    if strategies is None:
+        strategies = DEFAULT_PORTFOLIO
+    if max_workers is None:
+        max_workers = min(len(strategies), os.cpu_count() or 1)
+    reason = find_unsolvable_reason(board, pairs)
+    if reason:
+        if verbose:
+            print(f"预检查: 棋盘无解 — {reason}")
+        return {}, None
+    ctx = multiprocessing.get_context()
+    result_queue = ctx.Queue()
+    pending = list(enumerate(strategies))
+    running = {}
+    best_paths = {}
+    best_strategy = None
+    best_cost = float('inf')
+    start_time = time.time()
+    try:
+        while pending or running:
+            while pending and len(running) < max_workers:
+                index, strategy = pending.pop(0)
+                process = ctx.Process(target=_portfolio_worker, args=(index, strategy, board, pairs, with_turning_cost, result_queue), daemon=True)
+                process.start()
+                running[index] = process
+            timeout = WORKER_POLL_INTERVAL
+            if deadline is not None:
+                remaining = deadline - (time.time() - start_time)
+                if remaining <= 0:
+                    if verbose:
+                        print(f"组合求解超时 ({deadline:.1f}秒)，停止剩余策略")
+                    break
+                timeout = min(remaining, WORKER_POLL_INTERVAL)
+            try:
+                index, chains, elapsed = result_queue.get(timeout=timeout)
+            except queue.Empty:
+                exited = [index for index, process in running.items() if process.exitcode is not None]
+                if exited and result_queue.empty():
+                    for index in exited:
+                        process = running.pop(index)
+                        if verbose:
+                            print(f"策略 {strategies[index]} 的进程异常退出 (退出码 {process.exitcode})，未返回结果")
+                continue
+            strategy = strategies[index]
+            process = running.pop(index, None)
+            if process is not None:
+                process.join()
+            paths = decode_paths(chains)
+            if not paths:
+                if verbose:
+                    print(f"策略 {strategy} 未找到解 ({elapsed:.2f}秒)")
+                continue
+            errors = validate_solution(board, pairs, paths)
+            if errors:
+                if verbose:
+                    print(f"策略 {strategy} 的解未通过验证: {errors[0]}")
+                continue
+            cost = sum(get_path_cost(path, with_turning_cost) for path in paths.values())
+            if verbose:
+                print(f"策略 {strategy} 找到解: 总代价={cost}, 用时={elapsed:.2f}秒")
+            if cost < best_cost:
+                best_paths, best_strategy, best_cost = paths, strategy, cost
+            if not wait_for_best:
+                break
+    finally:
+        for process in running.values():
+            process.terminate()
+        for process in running.values():
+            process.join()
+        result_queue.close()
+    if verbose:
+        if best_strategy is not None:
+            print(f"组合求解完成: 获胜策略={best_strategy}, 总代价={best_cost}, 用时={time.time() - start_time:.2f}秒")
+        else:
+            print("组合求解失败: 所有策略均未找到解")
+    return best_paths, best_strategy
+
+def decompose_colors(board: np.ndarray, pairs: Dict[int, List[Tuple[int, int]]], margin: int = 1) -> List[List[int]]:
+    size = board.shape[0]
+    blocked, neighbors = _free_cell_graph(size, pairs)
+    component = _free_components(size, blocked, neighbors)
+    colors = [color for color in order_colors(board, pairs) if len(pairs[color]) == 2]
+    regions = {}
+    for color in colors:
+        (x1, y1), (x2, y2) = pairs[color]
+        cells = [x1 * size + y1, x2 * size + y2]
+        reach = {component[other] for cell in cells for other in neighbors[cell] if not blocked[other]}
+        box = (min(x1, x2) - margin, max(x1, x2) + margin, min(y1, y2) - margin, max(y1, y2) + margin)
+        regions[color] = (reach, box)
+    parent = {color: color for color in colors}
+    def find(color):
+        while parent[color] != color:
+            parent[color] = parent[parent[color]]
+            color = parent[color]
+        return color
+    for i, a in enumerate(colors):
+        reach_a, box_a = regions[a]
+        for b in colors[i + 1:]:
+            reach_b, box_b = regions[b]
+            if box_a[0] > box_b[1] or box_b[0] > box_a[1] or box_a[2] > box_b[3] or box_b[2] > box_a[3]:
+                continue
+            if reach_a & reach_b:
+                parent[find(a)] = find(b)
+    groups = defaultdict(list)
+    for color in colors:
+        groups[find(color)].append(color)
+    return sorted(groups.values(), key=len, reverse=True)
+
+def solve_group(board: np.ndarray, pairs: Dict[int, List[Tuple[int, int]]], group: List[int], with_turning_cost: bool = False, permutation_limit: int = 8, cancel_event=None) -> Dict[int, List[Tuple[int, int]]]:
+    workspace = SearchWorkspace(board.shape[0])
+    if len(group) > permutation_limit:
+        return solve_with_order(board, pairs, group, with_turning_cost, False, cancel_event=cancel_event, workspace=workspace)
+    for perm in itertools.permutations(group):
+        if cancel_event is not None and cancel_event.is_set():
+            return {}
+        paths = solve_with_order(board, pairs, list(perm), with_turning_cost, False, cancel_event=cancel_event, workspace=workspace)
+        if paths:
+            return paths
+    return {}
+
+def _group_worker(index, board, pairs, group, with_turning_cost, permutation_limit, result_queue):
+    try:
+        paths = solve_group(board, pairs, group, with_turning_cost, permutation_limit)
+    except Exception:
+        paths = {}
+    result_queue.put((index, encode_paths(paths)))
+
+def solve_decomposed(board: np.ndarray, pairs: Dict[int, List[Tuple[int, int]]], with_turning_cost: bool = False, verbose: bool = True, permutation_limit: int = 8, max_workers: Optional[int] = None, cancel_event=None, groups: Optional[List[List[int]]] = None) -> Dict[int, List[Tuple[int, int]]]:
+    start_time = time.time()
+    if groups is None:
+        groups = decompose_colors(board, pairs)
+    if max_workers is None:
+        max_workers = os.cpu_count() or 1
+    if verbose:
+        print(f"分解为 {len(groups)} 个独立子问题: {[len(group) for group in groups]}")
+    results = {}
+    if max_workers <= 1 or len(groups) <= 1:
+        for index, group in enumerate(groups):
+            results[index] = solve_group(board, pairs, group, with_turning_cost, permutation_limit, cancel_event)
+            if not results[index]:
+                break
+    else:
+        ctx = multiprocessing.get_context()
+        result_queue = ctx.Queue()
+        pending = list(enumerate(groups))
+        running = {}
+        try:
+            while pending or running:
+                while pending and len(running) < max_workers:
+                    index, group = pending.pop(0)
+                    process = ctx.Process(target=_group_worker, args=(index, board, pairs, group, with_turning_cost, permutation_limit, result_queue), daemon=True)
+                    process.start()
+                    running[index] = process
+                if cancel_event is not None and cancel_event.is_set():
+                    return {}
+                try:
+                    index, chains = result_queue.get(timeout=WORKER_POLL_INTERVAL)
+                except queue.Empty:
+                    exited = [index for index, process in running.items() if process.exitcode is not None]
+                    if exited and result_queue.empty():
+                        index = exited[0]
+                        if verbose:
+                            print(f"子问题 {groups[index]} 的进程异常退出 (退出码 {running[index].exitcode})，未返回结果")
+                        running.pop(index)
+                        return {}
+                    continue
+                running.pop(index).join()
+                results[index] = decode_paths(chains)
+                if not chains:
+                    break
+        finally:
+            for process in running.values():
+                process.terminate()
+            for process in running.values():
+                process.join()
+            result_queue.close()
+    if cancel_event is not None and cancel_event.is_set():
+        return {}
+    failed = [groups[index] for index, paths in results.items() if not paths]
+    if failed:
+        if verbose:
+            print(f"子问题 {failed[0]} 无解，求解失败")
+        return {}
+    color_paths = {}
+    for index in range(len(groups)):
+        color_paths.update(results[index])
+    rank = {color: i for i, color in enumerate(order_colors(board, pairs))}
+    errors = validate_solution(board, pairs, color_paths)
+    while errors:
+        group_of = {color: index for index, group in enumerate(groups) for color in group}
+        clashing = sorted({group_of[color] for error in errors for color in error["colors"] if color in group_of})
+        if len(clashing) <= 1:
+            if verbose:
+                print(f"子问题的解未通过验证 ({errors[0]['type']})，求解失败")
+            return {}
+        merged = sorted((color for index in clashing for color in groups[index]), key=lambda color: rank.get(color, len(rank)))
+        if verbose:
+            print(f"子问题的解合并后冲突 ({errors[0]['type']})，合并 {len(clashing)} 个子问题 ({len(merged)} 种颜色) 重新求解")
+        groups = [group for index, group in enumerate(groups) if index not in clashing] + [merged]
+        paths = solve_group(board, pairs, merged, with_turning_cost, permutation_limit, cancel_event)
+        if cancel_event is not None and cancel_event.is_set():
+            return {}
+        if not paths:
+            if verbose:
+                print(f"合并后的子问题 {merged} 无解，求解失败")
+            return {}
+        for color in merged:
+            color_paths.pop(color, None)
+        color_paths.update(paths)
+        errors = validate_solution(board, pairs, color_paths)
+    if verbose:
+        print(f"分解求解完成: 用时={time.time() - start_time:.2f}秒")
     return color_paths
 
 def generate_random_pairs(board_size: int, num_pairs: int, seed: Optional[int] = None) -> Dict[int, List[Tuple[int, int]]]:
@@ -455,6 +1339,314 @@ def generate_random_pairs(board_size: int, num_pairs: int, seed: Optional[int] =
         pairs[color] = pair_positions
     return pairs
 
+def generate_solvable_puzzle(board_size: int, num_pairs: Optional[int] = None, seed: Optional[int] = None, density: float = 0.5, min_length: int = 2, max_length: Optional[int] = None, turn_probability: float = 0.3, max_attempts: Optional[int] = None) -> Dict:
+    rng = np.random.default_rng(seed)
+    size = board_size
+    width = size + 2
+    if max_length is None:
+        max_length = size * 2
+    max_length = max(max_length, min_length)
+    if num_pairs is None:
+        num_pairs = size * size
+    if max_attempts is None:
+        max_attempts = num_pairs * 4 + 16
+    offsets = (-width, 1, width, -1)
+    grid = bytearray(b"\x01") * (width * width)
+    for x in range(size):
+        grid[(x + 1) * width + 1:(x + 1) * width + 1 + size] = bytes(size)
+    order = rng.permutation(size * size)
+    candidates = ((order // size + 1) * width + order % size + 1).tolist()
+    target_cells = int(density * size * size)
+    covered = 0
+    cursor = 0
+    attempts = 0
+    pairs = {}
+    paths = {}
+    cost = 0
+    turn_total = 0
+    while len(pairs) < num_pairs and covered < target_cells and attempts < max_attempts:
+        while cursor < len(candidates) and grid[candidates[cursor]]:
+            cursor += 1
+        if cursor >= len(candidates):
+            break
+        attempts += 1
+        cell = candidates[cursor]
+        grid[cell] = 1
+        walk = [cell]
+        length = min_length + int(rng.integers(0, max_length - min_length + 1))
+        rolls = rng.random(2 * length + 1).tolist()
+        heading = int(rolls[-1] * 4)
+        turns = 0
+        for step_index in range(length):
+            step = offsets[heading]
+            if grid[cell + step] or rolls[2 * step_index] < turn_probability:
+                left, right = (heading + 3) % 4, (heading + 1) % 4
+                left_free = not grid[cell + offsets[left]]
+                right_free = not grid[cell + offsets[right]]
+                if left_free and right_free:
+                    new_heading = left if rolls[2 * step_index + 1] < 0.5 else right
+                elif left_free:
+                    new_heading = left
+                elif right_free:
+                    new_heading = right
+                elif not grid[cell + step]:
+                    new_heading = heading
+                else:
+                    break
+                if new_heading != heading and len(walk) > 1:
+                    turns += 1
+                heading = new_heading
+                step = offsets[heading]
+            cell += step
+            grid[cell] = 1
+            walk.append(cell)
+        if len(walk) - 1 < min_length:
+            for cell in walk[1:]:
+                grid[cell] = 0
+            cursor += 1
+            continue
+        color = len(pairs) + 1
+        xs, ys = np.divmod(np.array(walk) - width - 1, width)
+        path = list(zip(xs.tolist(), ys.tolist()))
+        pairs[color] = [path[0], path[-1]]
+        paths[color] = path
+        covered += len(path)
+        cost += len(path) - 1
+        turn_total += turns
+    return {
+        "size": size,
+        "seed": seed,
+        "pairs": pairs,
+        "paths": paths,
+        "cost": cost,
+        "cost_with_turns": cost + turn_total * 2,
+    }
+
+def _generate_puzzle_job(args):
+    board_size, seed, kwargs = args
+    puzzle = generate_solvable_puzzle(board_size, seed=seed, **kwargs)
+    puzzle["paths"] = encode_paths(puzzle["paths"])
+    return puzzle
+
+def generate_solvable_puzzles(count: int, board_size: int, seed: Optional[int] = None, workers: int = 1, **kwargs):
+    base_seed = 0 if seed is None else seed
+    if workers <= 1:
+        for i in range(count):
+            yield generate_solvable_puzzle(board_size, seed=base_seed + i, **kwargs)
+        return
+    jobs = ((board_size, base_seed + i, kwargs) for i in range(count))
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        for puzzle in pool.map(_generate_puzzle_job, jobs, chunksize=64):
+            puzzle["paths"] = decode_paths(puzzle["paths"])
+            yield puzzle
+
+def _free_cell_graph(size: int, pairs: Dict[int, List[Tuple[int, int]]]) -> Tuple[bytearray, List[List[int]]]:
+    blocked = bytearray(size * size)
+    for positions in pairs.values():
+        for x, y in positions:
+            blocked[x * size + y] = 1
+    neighbors = [[] for _ in range(size * size)]
+    for x in range(size):
+        for y in range(size):
+            cell = x * size + y
+            if x > 0: neighbors[cell].append(cell - size)
+            if y < size - 1: neighbors[cell].append(cell + 1)
+            if x < size - 1: neighbors[cell].append(cell + size)
+            if y > 0: neighbors[cell].append(cell - 1)
+    return blocked, neighbors
+
+def _free_components(size: int, blocked: bytearray, neighbors: List[List[int]]) -> List[int]:
+    component = [-1] * (size * size)
+    label = 0
+    for seed in range(size * size):
+        if blocked[seed] or component[seed] != -1:
+            continue
+        component[seed] = label
+        stack = [seed]
+        while stack:
+            cell = stack.pop()
+            for other in neighbors[cell]:
+                if not blocked[other] and component[other] == -1:
+                    component[other] = label
+                    stack.append(other)
+        label += 1
+    return component
+
+def _articulation_points(size: int, blocked: bytearray, neighbors: List[List[int]]) -> Tuple[List[int], List[int], Dict[int, List[Tuple[int, int]]]]:
+    disc = [-1] * (size * size)
+    low = [0] * (size * size)
+    subtree = [1] * (size * size)
+    separated = defaultdict(list)
+    counter = 0
+    for root in range(size * size):
+        if blocked[root] or disc[root] != -1:
+            continue
+        disc[root] = low[root] = counter
+        counter += 1
+        root_children = []
+        stack = [(root, -1, iter(neighbors[root]))]
+        while stack:
+            cell, parent, it = stack[-1]
+            advanced = False
+            for other in it:
+                if blocked[other] or other == parent:
+                    continue
+                if disc[other] == -1:
+                    disc[other] = low[other] = counter
+                    counter += 1
+                    stack.append((other, cell, iter(neighbors[other])))
+                    advanced = True
+                    break
+                low[cell] = min(low[cell], disc[other])
+            if advanced:
+                continue
+            stack.pop()
+            if parent != -1:
+                low[parent] = min(low[parent], low[cell])
+                subtree[parent] += subtree[cell]
+                if parent == root:
+                    root_children.append(cell)
+                elif low[cell] >= disc[parent]:
+                    separated[parent].append((disc[cell], disc[cell] + subtree[cell]))
+        if len(root_children) > 1:
+            separated[root] = [(disc[child], disc[child] + subtree[child]) for child in root_children]
+    return disc, low, separated
+
+FLOW_CHECK_MAX_CELLS = 32 * 32
+
+def _max_disjoint_paths(size: int, blocked: bytearray, neighbors: List[List[int]], oriented: List[Tuple[int, int]], cancel_event=None) -> Optional[int]:
+    cells = size * size
+    source = 2 * cells
+    sink = source + 1
+    adjacency = [[] for _ in range(sink + 1)]
+    to = []
+    capacity = []
+    def add_edge(u, v):
+        adjacency[u].append(len(to))
+        to.append(v)
+        capacity.append(1)
+        adjacency[v].append(len(to))
+        to.append(u)
+        capacity.append(0)
+    sinks = {b for _, b in oriented}
+    for cell in range(cells):
+        if blocked[cell]:
+            continue
+        add_edge(2 * cell, 2 * cell + 1)
+        for other in neighbors[cell]:
+            if not blocked[other] or other in sinks:
+                add_edge(2 * cell + 1, 2 * other)
+    for a, b in oriented:
+        add_edge(source, 2 * a + 1)
+        add_edge(2 * b, sink)
+        for other in neighbors[a]:
+            if not blocked[other] or other == b:
+                add_edge(2 * a + 1, 2 * other)
+    flow = 0
+    while True:
+        if cancel_event is not None and cancel_event.is_set():
+            return None
+        level = [-1] * (sink + 1)
+        level[source] = 0
+        frontier = [source]
+        while frontier and level[sink] == -1:
+            next_frontier = []
+            for u in frontier:
+                for edge in adjacency[u]:
+                    v = to[edge]
+                    if capacity[edge] and level[v] == -1:
+                        level[v] = level[u] + 1
+                        next_frontier.append(v)
+            frontier = next_frontier
+        if level[sink] == -1:
+            return flow
+        cursor = [0] * (sink + 1)
+        while True:
+            path = []
+            u = source
+            while u != sink:
+                edges = adjacency[u]
+                while cursor[u] < len(edges):
+                    edge = edges[cursor[u]]
+                    if capacity[edge] and level[to[edge]] == level[u] + 1:
+                        break
+                    cursor[u] += 1
+                if cursor[u] == len(edges):
+                    if u == source:
+                        break
+                    level[u] = -1
+                    edge = path.pop()
+                    u = to[edge ^ 1]
+                    cursor[u] += 1
+                    continue
+                path.append(edge)
+                u = to[edge]
+            if u != sink:
+                break
+            for edge in path:
+                capacity[edge] -= 1
+                capacity[edge ^ 1] += 1
+            flow += 1
+            if cancel_event is not None and cancel_event.is_set():
+                return None
+
+def find_unsolvable_reason(board: np.ndarray, pairs: Dict[int, List[Tuple[int, int]]], with_flow: Optional[bool] = None, cancel_event=None) -> Optional[str]:
+    size = board.shape[0]
+    if with_flow is None:
+        with_flow = size * size <= FLOW_CHECK_MAX_CELLS
+    blocked, neighbors = _free_cell_graph(size, pairs)
+    routed = []
+    for color, positions in pairs.items():
+        if len(positions) != 2:
+            continue
+        start, end = positions
+        a, b = start[0] * size + start[1], end[0] * size + end[1]
+        if b in neighbors[a]:
+            continue
+        for pos, cell in ((start, a), (end, b)):
+            if all(blocked[other] for other in neighbors[cell]):
+                return f"颜色 {color} 的棋子 {pos} 四周均被占据，无法引出路径"
+        routed.append((color, a, b))
+    if not routed:
+        return None
+    component = _free_components(size, blocked, neighbors)
+    exits = {}
+    for color, a, b in routed:
+        exits[a] = [other for other in neighbors[a] if not blocked[other]]
+        exits[b] = [other for other in neighbors[b] if not blocked[other]]
+        if not {component[u] for u in exits[a]} & {component[u] for u in exits[b]}:
+            return f"颜色 {color} 的两个棋子 {divmod(a, size)} 和 {divmod(b, size)} 位于互不连通的空白区域"
+    disc, _, separated = _articulation_points(size, blocked, neighbors)
+    for cut, intervals in separated.items():
+        def regions(endpoint):
+            result = set()
+            for u in exits[endpoint]:
+                if u == cut:
+                    continue
+                if component[u] != component[cut]:
+                    result.add(("other", component[u]))
+                    continue
+                for index, (lo, hi) in enumerate(intervals):
+                    if lo <= disc[u] < hi:
+                        result.add(("side", index))
+                        break
+                else:
+                    result.add(("side", -1))
+            return result
+        forced = [color for color, a, b in routed if not regions(a) & regions(b)]
+        if len(forced) > 1:
+            return f"格子 {divmod(cut, size)} 是唯一通道，颜色 {', '.join(map(str, forced))} 都必须经过它"
+    if not with_flow:
+        return None
+    for key in (lambda cell: divmod(cell, size), lambda cell: divmod(cell, size)[::-1]):
+        oriented = [tuple(sorted((a, b), key=key)) for _, a, b in routed]
+        flow = _max_disjoint_paths(size, blocked, neighbors, oriented, cancel_event)
+        if flow is None:
+            return None
+        if flow < len(routed):
+            return f"最大流上界: 最多只能同时连通 {flow} 对棋子，但需要连通 {len(routed)} 对"
+    return None
+
 def validate_board_configuration(board: np.ndarray, pairs: Dict[int, List[Tuple[int, int]]]) -> bool:
     size = board.shape[0]
     for color, positions in pairs.items():
@@ -468,4 +1660,97 @@ def validate_board_configuration(board: np.ndarray, pairs: Dict[int, List[Tuple[
     if len(all_positions) != len(set(all_positions)):
         print("存在重叠的棋子")
         return False
-    return True
\ No newline at end of file
+    return True
+
+def rasterize_solution(size: int, paths: Dict[int, List[Tuple[int, int]]]) -> Tuple[np.ndarray, np.ndarray, np.ndarray, Dict[int, np.ndarray]]:
+    labels = np.zeros((size, size), dtype=np.int32)
+    h_owner = np.zeros((size, size - 1), dtype=np.int32)
+    v_owner = np.zeros((size - 1, size), dtype=np.int32)
+    cell_count = np.zeros(size * size, dtype=np.int32)
+    edge_count = np.zeros(2 * size * size, dtype=np.int32)
+    coords = {}
+    for color, path in paths.items():
+        arr = np.asarray(path, dtype=np.int64).reshape(-1, 2)
+        coords[color] = arr
+        inside = ((arr >= 0) & (arr < size)).all(axis=1)
+        flat = arr[inside, 0] * size + arr[inside, 1]
+        cells = np.unique(flat)
+        cell_count[cells] += 1
+        labels.flat[cells] = color
+        if len(arr) < 2:
+            continue
+        ok = inside[:-1] & inside[1:] & (np.abs(np.diff(arr, axis=0)).sum(axis=1) == 1)
+        a = (arr[:-1, 0] * size + arr[:-1, 1])[ok]
+        b = (arr[1:, 0] * size + arr[1:, 1])[ok]
+        lo = np.minimum(a, b)
+        horizontal = np.abs(a - b) == 1
+        edges = np.unique(lo * 2 + horizontal)
+        edge_count[edges] += 1
+        cell = edges // 2
+        is_h = (edges % 2) == 1
+        h_owner[cell[is_h] // size, cell[is_h] % size] = color
+        v_owner[cell[~is_h] // size, cell[~is_h] % size] = color
+    labels.flat[np.flatnonzero(cell_count > 1)] = -1
+    conflict_edges = np.flatnonzero(edge_count > 1)
+    cell = conflict_edges // 2
+    is_h = (conflict_edges % 2) == 1
+    h_owner[cell[is_h] // size, cell[is_h] % size] = -1
+    v_owner[cell[~is_h] // size, cell[~is_h] % size] = -1
+    return labels, h_owner, v_owner, coords
+
+def validate_solution(board: np.ndarray, pairs: Dict[int, List[Tuple[int, int]]], paths: Dict[int, List[Tuple[int, int]]]) -> List[Dict]:
+    size = board.shape[0]
+    errors = []
+    for color, positions in pairs.items():
+        if len(positions) == 2 and color not in paths:
+            errors.append({"type": "missing", "colors": [color]})
+    pieces = np.zeros((size, size), dtype=np.int32)
+    for color, positions in pairs.items():
+        for x, y in positions:
+            if 0 <= x < size and 0 <= y < size:
+                pieces[x, y] = color
+    labels, h_owner, v_owner, coords = rasterize_solution(size, paths)
+    for color, arr in coords.items():
+        if color not in pairs or len(pairs[color]) != 2:
+            errors.append({"type": "unknown_color", "colors": [color]})
+            continue
+        if len(arr) == 0:
+            errors.append({"type": "empty", "colors": [color]})
+            continue
+        inside = ((arr >= 0) & (arr < size)).all(axis=1)
+        for i in np.flatnonzero(~inside):
+            errors.append({"type": "out_of_bounds", "colors": [color], "cell": (int(arr[i, 0]), int(arr[i, 1])), "step": int(i)})
+        start, end = pairs[color]
+        first, last = (int(arr[0, 0]), int(arr[0, 1])), (int(arr[-1, 0]), int(arr[-1, 1]))
+        if {first, last} != {tuple(start), tuple(end)}:
+            errors.append({"type": "endpoint_mismatch", "colors": [color], "expected": [tuple(start), tuple(end)], "actual": [first, last]})
+        if len(arr) > 1:
+            jumps = np.flatnonzero(np.abs(np.diff(arr, axis=0)).sum(axis=1) != 1)
+            for i in jumps:
+                errors.append({"type": "discontinuity", "colors": [color], "cell": (int(arr[i, 0]), int(arr[i, 1])), "next": (int(arr[i + 1, 0]), int(arr[i + 1, 1])), "step": int(i)})
+        flat = arr[inside, 0] * size + arr[inside, 1]
+        cells, counts = np.unique(flat, return_counts=True)
+        for cell in cells[counts > 1]:
+            errors.append({"type": "self_overlap", "colors": [color], "cell": (int(cell // size), int(cell % size))})
+        owners = pieces.flat[cells]
+        for cell in cells[(owners != 0) & (owners != color)]:
+            errors.append({"type": "piece_conflict", "colors": [color, int(pieces.flat[cell])], "cell": (int(cell // size), int(cell % size))})
+    conflict_cells = np.flatnonzero(labels.ravel() == -1)
+    if len(conflict_cells):
+        for cell in conflict_cells:
+            x, y = int(cell // size), int(cell % size)
+            colors = [color for color, arr in coords.items() if ((arr[:, 0] == x) & (arr[:, 1] == y)).any()]
+            errors.append({"type": "cell_conflict", "colors": colors, "cell": (x, y)})
+    for owner, dx, dy in ((h_owner, 0, 1), (v_owner, 1, 0)):
+        for x, y in zip(*np.nonzero(owner == -1)):
+            a, b = (int(x), int(y)), (int(x) + dx, int(y) + dy)
+            colors = []
+            for color, arr in coords.items():
+                if len(arr) < 2:
+                    continue
+                forward = (arr[:-1, 0] == a[0]) & (arr[:-1, 1] == a[1]) & (arr[1:, 0] == b[0]) & (arr[1:, 1] == b[1])
+                backward = (arr[:-1, 0] == b[0]) & (arr[:-1, 1] == b[1]) & (arr[1:, 0] == a[0]) & (arr[1:, 1] == a[1])
+                if (forward | backward).any():
+                    colors.append(color)
+            errors.append({"type": "edge_conflict", "colors": colors, "edge": (a, b)})
+    return errors